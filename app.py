@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
 import sqlite3
 import math
@@ -9,6 +10,8 @@ from datetime import date, datetime, timedelta
 import folium
 from streamlit_folium import st_folium
 
+from backend.geo import coordenadas, haversine_km
+
 # Importar os scrapers
 from scraper_local import rodar_crawler as buscar_passagens, init_db as init_db_voos
 from scraper_aluguel_carros import rodar_crawler as buscar_carros, init_db as init_db_carros
@@ -399,25 +402,14 @@ with tab1:
                     # Função para calcular distância aproximada entre dois aeroportos (em km)
                     def calcular_distancia(iata1, iata2):
                         """Calcula distância aproximada em linha reta entre dois aeroportos"""
-                        import math
-                        
-                        coords1 = df_airports[df_airports['iata_code'] == iata1][['latitude_deg', 'longitude_deg']]
-                        coords2 = df_airports[df_airports['iata_code'] == iata2][['latitude_deg', 'longitude_deg']]
+                        # Coordenadas pelo índice de aeroportos compartilhado com o engine
+                        lat, lon = coordenadas([iata1, iata2])
                         
-                        if coords1.empty or coords2.empty:
+                        if not (np.isfinite(lat).all() and np.isfinite(lon).all()):
                             return None
                         
-                        lat1, lon1 = coords1.iloc[0]['latitude_deg'], coords1.iloc[0]['longitude_deg']
-                        lat2, lon2 = coords2.iloc[0]['latitude_deg'], coords2.iloc[0]['longitude_deg']
-                        
                         # Fórmula de Haversine para distância em linha reta
-                        R = 6371  # Raio da Terra em km
-                        lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-                        dlat = lat2 - lat1
-                        dlon = lon2 - lon1
-                        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-                        c = 2 * math.asin(math.sqrt(a))
-                        distancia_linha_reta = R * c
+                        distancia_linha_reta = float(haversine_km(lat[0], lon[0], lat[1], lon[1]))
                         
                         # Multiplicar por 1.3 para aproximar distância rodoviária
                         distancia_rodoviaria = distancia_linha_reta * 1.3
@@ -706,159 +698,141 @@ with tab2:
         
         alpha = st.slider("Prioridade: Custo (1) vs Tempo (0)", 0.0, 1.0, 0.7, key="alpha_otimizador")
         st.caption("💡 Prioridade determina o foco: **1.0 = Economia** (mais barato), **0.0 = Velocidade** (mais rápido), **0.5 = Balanceado**")
+        
+        horarios = st.checkbox("Considerar horários de conexão", value=False, key="horarios_otimizador",
+                               help="Só encadeia trechos que partem depois da chegada anterior mais 1h de conexão; a espera entra no tempo total")
     
     # --- BOTÃO OTIMIZAR ---
     st.markdown("---")
+    from backend.engine import TripOptimizerEngine, versao_dados
+    
+    # A versão dos dados entra na chave: depois de uma coleta nova o resultado guardado deixa de valer
+    chave_otimizador = (tuple(origens_iata), tuple(destinos_iata), budget, horarios, versao_dados(DB_NAME))
     if st.button("Calcular Melhor Itinerário", width='stretch', key="calcular_itinerario"):
         if not origens_iata or not destinos_iata:
             st.warning("Selecione pelo menos uma origem e um destino.")
         else:
-            from backend.engine import TripOptimizerEngine
-            
-            # Mostrar configuração para debug
-            st.info(f"🔧 Configuração: Orçamento R$ {budget:,.2f} | Prioridade Alpha = {alpha:.2f} ({'ECONOMIA' if alpha >= 0.7 else 'VELOCIDADE' if alpha <= 0.3 else 'BALANCEADO'})")
+            # Processar múltiplas origens em uma única passada do engine
+            # (dados carregados uma vez; deduplicação e fronteira já vêm do engine)
+            config_solver = {'origem': origens_iata[0], 'destinos': destinos_iata, 'budget': budget, 'alpha': alpha,
+                             'horarios': horarios}
             
-            # Processar múltiplas origens
-            all_solutions = []
+            # Um engine por sessão: os pools de preparar_pool ficam nele e são reaproveitados
+            # entre cliques com os mesmos parâmetros e os mesmos dados
+            if 'engine_otimizador' not in st.session_state:
+                st.session_state.engine_otimizador = TripOptimizerEngine(DB_NAME, config_solver)
+            engine = st.session_state.engine_otimizador
+            engine.config = config_solver
             
-            for origem_iata in origens_iata:
-                config_solver = {'origem': origem_iata, 'destinos': destinos_iata, 'budget': budget, 'alpha': alpha}
-                
-                engine = TripOptimizerEngine(DB_NAME, config_solver)
-                
-                with st.spinner(f'Otimizando rotas partindo de {origem_iata}...'):
-                    solucoes = engine.solve()
-                    
-                    if isinstance(solucoes, str):
-                        if solucoes == "ERRO_SEM_RETORNO":
-                            st.warning(f"⚠️ Partindo de {origem_iata}: Não existem voos de volta para esta origem no banco.")
-                        elif solucoes == "ERRO_SEM_DADOS":
-                            st.warning(f"⚠️ Partindo de {origem_iata}: Não há dados suficientes no banco.")
-                        else:
-                            st.warning(f"⚠️ Partindo de {origem_iata}: {solucoes}")
-                    elif solucoes is not None and len(solucoes) > 0:
-                        all_solutions.extend(solucoes)
+            with st.spinner(f'Otimizando rotas partindo de {", ".join(origens_iata)}...'):
+                pool, erros_origem = engine.preparar_pool(origens_iata)
             
-            # Processar todas as soluções coletadas
-            if all_solutions:
-                # Remover duplicatas mantendo a ordem de cada engine
-                unique_solutions = []
-                seen_routes = set()
-                
-                for sol in all_solutions:
-                    route_key = tuple(
-                        (row['origem'], row['destino'], row.get('companhia', ''), row.get('preco_numerico', 0))
-                        for _, row in sol['itinerario'].iterrows()
+            # O pool não depende do alpha: guardado na sessão, mover o slider de prioridade
+            # apenas reordena as soluções, sem recalcular rotas
+            st.session_state.otimizador = {
+                'chave': chave_otimizador, 'pool': pool, 'erros': erros_origem, 'metadados': engine.metadados
+            }
+    
+    resultado_otimizador = st.session_state.get('otimizador')
+    if resultado_otimizador and resultado_otimizador['chave'] == chave_otimizador:
+        pool, erros_origem = resultado_otimizador['pool'], resultado_otimizador['erros']
+        
+        # Mostrar configuração para debug
+        st.info(f"🔧 Configuração: Orçamento R$ {budget:,.2f} | Prioridade Alpha = {alpha:.2f} ({'ECONOMIA' if alpha >= 0.7 else 'VELOCIDADE' if alpha <= 0.3 else 'BALANCEADO'})")
+        
+        for origem_iata, erro in erros_origem.items():
+            if erro == "ERRO_SEM_RETORNO":
+                st.warning(f"⚠️ Partindo de {origem_iata}: Não existem voos de volta para esta origem no banco.")
+            elif erro == "ERRO_SEM_DADOS":
+                st.warning(f"⚠️ Partindo de {origem_iata}: Não há dados suficientes no banco.")
+            else:
+                st.warning(f"⚠️ Partindo de {origem_iata}: {erro}")
+        
+        # Tempos por fase e contadores do cálculo do pool (leitura, durações, geração, Pareto...)
+        metadados = resultado_otimizador.get('metadados')
+        if metadados is not None:
+            with st.expander("🔬 Diagnóstico do Otimizador"):
+                st.caption(f"Tempo total do cálculo: {metadados.total_ns / 1e6:,.1f} ms")
+                col_fases, col_contadores = st.columns([3, 2])
+                with col_fases:
+                    st.dataframe(
+                        pd.DataFrame(metadados.tabela()).round({'ms': 2, '% do total': 1}),
+                        width='stretch', hide_index=True
                     )
-                    
-                    if route_key not in seen_routes:
-                        seen_routes.add(route_key)
-                        unique_solutions.append(sol)
+                with col_contadores:
+                    st.dataframe(
+                        pd.DataFrame(list(metadados.contadores.items()), columns=['contador', 'valor']),
+                        width='stretch', hide_index=True
+                    )
+        
+        # Processar todas as soluções coletadas
+        all_solutions = pool.ranquear(alpha, 20) if pool else None  # Só as exibidas são materializadas
+        if all_solutions:
+            solucoes = all_solutions[:20]  # Limitar a 20 melhores
+            
+            # Mostrar critério de ordenação baseado no alpha
+            if alpha >= 0.7:
+                criterio_msg = f"🏆 **Ordenadas por CUSTO** (alpha={alpha:.2f} - Foco em Economia)"
+            elif alpha <= 0.3:
+                criterio_msg = f"⚡ **Ordenadas por TEMPO** (alpha={alpha:.2f} - Foco em Velocidade)"
+            else:
+                criterio_msg = f"⚖️ **Ordenadas por EQUILÍBRIO** (alpha={alpha:.2f} - Balanceado)"
+            
+            st.success(f"🎯 {len(solucoes)} {'Opção' if len(solucoes) == 1 else 'Opções'} de Itinerário Encontrada{'s' if len(solucoes) > 1 else ''}!")
+            st.info(criterio_msg)
+            
+            # Exibir informação sobre múltiplas opções
+            if len(solucoes) > 1:
+                origem_texto = ", ".join(origens_iata)
+                st.info(f"💡 **Múltiplas Opções**: Explore diferentes combinações partindo de **{origem_texto}** com voos e carros. Cada opção oferece um equilíbrio diferente entre custo e tempo de viagem!")
+            
+            # Exibir todas as soluções uma abaixo da outra
+            for i, sol in enumerate(solucoes, 1):
+                itinerario = sol['itinerario']
+                horas = int(sol['tempo'] // 60)
+                minutos = int(sol['tempo'] % 60)
                 
-                # REORDENAR todas as soluções combinadas baseado no ALPHA
-                # Quando há múltiplas origens, precisamos reordenar o conjunto final
-                if alpha >= 0.7:
-                    # ECONOMIA: Ordenar por custo
-                    unique_solutions.sort(key=lambda x: x['custo'])
-                elif alpha <= 0.3:
-                    # VELOCIDADE: Ordenar por tempo
-                    unique_solutions.sort(key=lambda x: x['tempo'])
+                # Determinar badge baseado em posição e alpha
+                if i == 1:
+                    if alpha <= 0.3:
+                        badge = "⚡ MAIS RÁPIDA"
+                    elif alpha >= 0.7:
+                        badge = "💰 MAIS BARATA"
+                    else:
+                        badge = "⭐ MELHOR SCORE"
                 else:
-                    # BALANCEADO: Ordenar por score
-                    # Calcular ranges para normalização
-                    all_custos = [s['custo'] for s in unique_solutions]
-                    all_tempos = [s['tempo'] for s in unique_solutions]
-                    min_c = min(all_custos)
-                    max_c = max(all_custos)
-                    min_t = min(all_tempos)
-                    max_t = max(all_tempos)
-                    range_c = max_c - min_c if max_c > min_c else 1
-                    range_t = max_t - min_t if max_t > min_t else 1
-                    
-                    # Calcular score e ordenar
-                    for sol in unique_solutions:
-                        custo_norm = (sol['custo'] - min_c) / range_c
-                        tempo_norm = (sol['tempo'] - min_t) / range_t
-                        sol['_final_score'] = alpha * custo_norm + (1-alpha) * tempo_norm
-                    
-                    unique_solutions.sort(key=lambda x: x['_final_score'])
-                
-                solucoes = unique_solutions[:20]  # Limitar a 20 melhores
+                    badge = ""
                 
-                if isinstance(solucoes, str):
-                    if solucoes == "ERRO_SEM_RETORNO":
-                        st.error(f"Inviável: Não existem voos de volta para as origens selecionadas no banco.")
-                    elif solucoes == "ERRO_SEM_DADOS":
-                        st.error("Inviável: Não há dados suficientes no banco para otimizar.")
-                    else:
-                        st.error(f"Erro: {solucoes}")
-                elif solucoes is not None and len(solucoes) > 0:
-                    # Mostrar critério de ordenação baseado no alpha
-                    if alpha >= 0.7:
-                        criterio_msg = f"🏆 **Ordenadas por CUSTO** (alpha={alpha:.2f} - Foco em Economia)"
-                    elif alpha <= 0.3:
-                        criterio_msg = f"⚡ **Ordenadas por TEMPO** (alpha={alpha:.2f} - Foco em Velocidade)"
+                # Container para cada opção com borda
+                with st.container():
+                    if badge:
+                        st.markdown(f"### 🔷 Opção {i} {badge}")
                     else:
-                        criterio_msg = f"⚖️ **Ordenadas por EQUILÍBRIO** (alpha={alpha:.2f} - Balanceado)"
+                        st.markdown(f"### 🔷 Opção {i}")
                     
-                    st.success(f"🎯 {len(solucoes)} {'Opção' if len(solucoes) == 1 else 'Opções'} de Itinerário Encontrada{'s' if len(solucoes) > 1 else ''}!")
-                    st.info(criterio_msg)
+                    # Métricas lado a lado
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("💰 Custo Total", f"R$ {sol['custo']:,.2f}")
+                    with col2:
+                        st.metric("⏱️ Tempo Total", f"{horas}h {minutos}min")
+                    with col3:
+                        custo_por_hora = sol['custo'] / (sol['tempo'] / 60) if sol['tempo'] > 0 else 0
+                        st.metric("📊 Custo/Hora", f"R$ {custo_por_hora:,.0f}")
                     
-                    # Exibir informação sobre múltiplas opções
-                    if len(solucoes) > 1:
-                        origem_texto = ", ".join(origens_iata)
-                        st.info(f"💡 **Múltiplas Opções**: Explore diferentes combinações partindo de **{origem_texto}** com voos e carros. Cada opção oferece um equilíbrio diferente entre custo e tempo de viagem!")
+                    # Tabela do itinerário (partida e espera só existem com horários de conexão)
+                    colunas = ['tipo', 'companhia', 'origem', 'destino', 'data_ida', 'preco_numerico', 'duracao']
+                    colunas += [c for c in ('partida', 'espera_min') if c in itinerario.columns]
+                    st.dataframe(itinerario[colunas], width='stretch')
                     
-                    # Exibir todas as soluções uma abaixo da outra
-                    for i, sol in enumerate(solucoes, 1):
-                        itinerario = sol['itinerario']
-                        horas = int(sol['tempo'] // 60)
-                        minutos = int(sol['tempo'] % 60)
-                        
-                        # Determinar badge baseado em posição e alpha
-                        if i == 1:
-                            if alpha <= 0.3:
-                                badge = "⚡ MAIS RÁPIDA"
-                            elif alpha >= 0.7:
-                                badge = "💰 MAIS BARATA"
-                            else:
-                                badge = "⭐ MELHOR SCORE"
-                        else:
-                            badge = ""
-                        
-                        # Container para cada opção com borda
-                        with st.container():
-                            if badge:
-                                st.markdown(f"### 🔷 Opção {i} {badge}")
-                            else:
-                                st.markdown(f"### 🔷 Opção {i}")
-                            
-                            # Métricas lado a lado
-                            col1, col2, col3 = st.columns(3)
-                            with col1:
-                                st.metric("💰 Custo Total", f"R$ {sol['custo']:,.2f}")
-                            with col2:
-                                st.metric("⏱️ Tempo Total", f"{horas}h {minutos}min")
-                            with col3:
-                                custo_por_hora = sol['custo'] / (sol['tempo'] / 60) if sol['tempo'] > 0 else 0
-                                st.metric("📊 Custo/Hora", f"R$ {custo_por_hora:,.0f}")
-                            
-                            # Tabela do itinerário
-                            st.dataframe(
-                                itinerario[['tipo', 'companhia', 'origem', 'destino', 'data_ida', 'preco_numerico', 'duracao']], 
-                                width='stretch'
-                            )
-                            
-                            # Expander para o mapa (economiza espaço)
-                            with st.expander("🗺️ Ver Mapa da Rota"):
-                                plot_itinerary_graph(itinerario, df_airports)
-                            
-                            # Separador visual entre opções
-                            st.markdown("---")
-                else:
-                    st.error("Inviável: Nenhuma solução encontrada para as origens selecionadas. Verifique se há dados suficientes no banco ou aumente o orçamento.")
-            else:
-                st.error("Inviável: Nenhuma solução encontrada para as origens selecionadas. Verifique se há dados suficientes no banco ou aumente o orçamento.")
+                    # Expander para o mapa (economiza espaço)
+                    with st.expander("🗺️ Ver Mapa da Rota"):
+                        plot_itinerary_graph(itinerario, df_airports)
+                    
+                    # Separador visual entre opções
+                    st.markdown("---")
+        else:
+            st.error("Inviável: Nenhuma solução encontrada para as origens selecionadas. Verifique se há dados suficientes no banco ou aumente o orçamento.")
 
 # --- SIDEBAR GLOBAL: INFORMAÇÕES E OPÇÕES ---
 st.sidebar.markdown("---")
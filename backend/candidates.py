@@ -0,0 +1,17 @@
+class Candidato:
+    """Solução candidata compacta: IDs globais das ofertas, custo, tempo e padrão de modos.
+
+    O DataFrame do itinerário não é guardado aqui; ele só é montado pelo engine para as
+    soluções que são efetivamente retornadas.
+    """
+
+    __slots__ = ('ofertas', 'custo', 'tempo', 'padrao')
+
+    def __init__(self, ofertas, custo, tempo, padrao):
+        self.ofertas = ofertas  # tupla de IDs globais (voos em [0, n_voos), carros depois)
+        self.custo = custo
+        self.tempo = tempo
+        self.padrao = padrao  # tupla com 'Voo'/'Carro' por segmento
+
+    def __repr__(self):
+        return f"Candidato({self.padrao}, custo={self.custo:.2f}, tempo={self.tempo:.0f})"
@@ -0,0 +1,45 @@
+import numpy as np
+from pymoo.core.termination import Termination
+
+from backend.pareto import hipervolume
+
+
+class EstagnacaoHipervolume(Termination):
+    """Critério de parada do NSGA-II por estagnação da fronteira.
+
+    A cada geração mede o hipervolume dos objetivos da fronteira viável da população,
+    normalizados pelos limites da primeira geração com soluções viáveis (referência 1.1
+    em cada eixo). Para quando o ganho relativo nas últimas `periodo` gerações não passa
+    de `tol`.
+    """
+
+    def __init__(self, periodo=10, tol=1e-3):
+        super().__init__()
+        self.periodo = periodo
+        self.tol = tol
+        self.historico = []
+        self._limites = None
+
+    def _update(self, algorithm):
+        opt = algorithm.opt
+        if opt is None or len(opt) == 0:
+            return 0.0
+        F = opt.get("F")
+        viaveis = opt.get("feasible")
+        if viaveis is not None:
+            F = F[viaveis.ravel()]
+        if len(F) == 0:
+            return 0.0
+
+        if self._limites is None:
+            minimo, maximo = F.min(axis=0), F.max(axis=0)
+            self._limites = (minimo, np.where(maximo > minimo, maximo - minimo, 1.0))
+        minimo, escala = self._limites
+        normalizado = (F - minimo) / escala
+        self.historico.append(hipervolume(normalizado[:, 0], normalizado[:, 1], (1.1, 1.1)))
+
+        if len(self.historico) <= self.periodo:
+            return 0.0
+        atual, anterior = self.historico[-1], self.historico[-1 - self.periodo]
+        ganho = (atual - anterior) / max(atual, 1e-12)
+        return 1.0 if ganho <= self.tol else 0.0
@@ -0,0 +1,56 @@
+import time
+from contextlib import contextmanager
+
+
+class Diagnostico:
+    """Tempos (ns) e contadores das fases de uma execução do otimizador.
+
+    Fases com o mesmo nome acumulam tempo e chamadas (ex.: geração de várias origens).
+    Fases aninhadas são medidas separadamente, então a soma pode passar do total.
+    """
+
+    def __init__(self):
+        self.inicio_ns = time.perf_counter_ns()
+        self.fim_ns = None
+        self.fases = {}  # nome -> ns acumulados, na ordem da primeira execução
+        self.chamadas = {}
+        self.contadores = {}
+
+    @contextmanager
+    def fase(self, nome):
+        inicio = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.fases[nome] = self.fases.get(nome, 0) + time.perf_counter_ns() - inicio
+            self.chamadas[nome] = self.chamadas.get(nome, 0) + 1
+
+    def contar(self, nome, n=1):
+        self.contadores[nome] = self.contadores.get(nome, 0) + int(n)
+
+    def encerrar(self):
+        self.fim_ns = time.perf_counter_ns()
+        return self
+
+    @property
+    def total_ns(self):
+        return (self.fim_ns or time.perf_counter_ns()) - self.inicio_ns
+
+    def como_dict(self):
+        return {
+            'total_ns': self.total_ns,
+            'fases': {nome: {'ns': ns, 'chamadas': self.chamadas[nome]} for nome, ns in self.fases.items()},
+            'contadores': dict(self.contadores),
+        }
+
+    def tabela(self):
+        """Linhas (fase, ms, chamadas, % do total) para exibição"""
+        total = self.total_ns or 1
+        return [
+            {'fase': nome, 'ms': ns / 1e6, 'chamadas': self.chamadas[nome], '% do total': 100 * ns / total}
+            for nome, ns in self.fases.items()
+        ]
+
+    def __repr__(self):
+        fases = ', '.join(f"{nome}={ns / 1e6:.1f}ms" for nome, ns in self.fases.items())
+        return f"Diagnostico(total={self.total_ns / 1e6:.1f}ms, {fases}, {self.contadores})"
@@ -0,0 +1,36 @@
+import re
+
+import pandas as pd
+
+
+def minutos(texto):
+    """Converte '6h 20m' para minutos inteiros (0 quando não há duração)"""
+    if not isinstance(texto, str):
+        return 0
+    horas = re.search(r'(\d+)h', texto)
+    mins = re.search(r'(\d+)m', texto)
+    return (int(horas.group(1)) if horas else 0) * 60 + (int(mins.group(1)) if mins else 0)
+
+
+def minutos_hhmm(texto):
+    """Converte 'HH:MM' para minutos inteiros; None quando o texto não está nesse formato"""
+    if not isinstance(texto, str):
+        return None
+    partes = re.fullmatch(r'\s*(\d+):(\d{1,2})\s*', texto)
+    if not partes:
+        return None
+    return int(partes.group(1)) * 60 + int(partes.group(2))
+
+
+def minutos_serie(serie):
+    """Versão vetorizada de minutos() para uma Series de textos ('6h 20m', None, ...)"""
+    texto = serie.astype(object).str  # valores que não são texto viram NaN
+    horas = pd.to_numeric(texto.extract(r'(\d+)h', expand=False), errors='coerce').fillna(0)
+    mins = pd.to_numeric(texto.extract(r'(\d+)m', expand=False), errors='coerce').fillna(0)
+    return (horas * 60 + mins).astype(int)
+
+
+def minutos_hhmm_serie(serie):
+    """Versão vetorizada de minutos_hhmm() para uma Series; NaN fora do formato 'HH:MM'"""
+    partes = serie.astype(object).str.extract(r'^\s*(\d+):(\d{1,2})\s*$')
+    return pd.to_numeric(partes[0], errors='coerce') * 60 + pd.to_numeric(partes[1], errors='coerce')
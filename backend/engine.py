@@ -1,17 +1,79 @@
+import copy
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import sqlite3
 import numpy as np
-import re
-from math import radians, cos, sin, asin, sqrt
 from pymoo.algorithms.moo.nsga2 import NSGA2
 from pymoo.core.problem import Problem
 from pymoo.optimize import minimize
 from pymoo.operators.crossover.pntx import TwoPointCrossover
 from pymoo.operators.mutation.bitflip import BitflipMutation
 from pymoo.operators.sampling.rnd import BinaryRandomSampling
-from pymoo.termination import get_termination
+from pymoo.termination.collection import TerminationCollection
+from pymoo.termination.max_gen import MaximumGenerationTermination
+from pymoo.termination.max_time import TimeBasedTermination
 from pymoo.util.nds.non_dominated_sorting import NonDominatedSorting
 
+from backend.candidates import Candidato
+from backend.convergencia import EstagnacaoHipervolume
+from backend.diagnostico import Diagnostico
+from backend.duracao import minutos_serie
+from backend.generators import (
+    amostrar_rota, avaliador, executar, executar_tarefa, fronteira_exata, fronteira_subconjuntos, iniciar_worker
+)
+from backend.geo import coordenadas, haversine_km
+from backend.horarios import GradeHorarios, parametros, propagar
+from backend.migrations import migrar
+from backend.pareto import ParetoArchive, nao_dominados, otimos_ponderados, proximos_da_fronteira
+from backend.pool import PoolCandidatos
+from backend.registro import caminho_log, registrar
+from backend.routing import rotas_viaveis
+from backend.segments import SegmentIndex
+from backend.segment_problem import (
+    SegmentTripProblem, SegmentSampling, SegmentWarmSampling, SegmentCrossover, SegmentMutation, sementes_kbest
+)
+
+logger = logging.getLogger(__name__)
+
+# Dados processados por (banco, aeroportos permitidos, versão dos dados), compartilhados entre
+# instâncias do engine; os DataFrames guardados aqui são tratados como somente leitura
+_cache_dados = OrderedDict()
+_CACHE_MAX_ENTRADAS = 8
+_POOLS_MAX_ENTRADAS = 8  # Pools guardados por instância (a interface mantém uma por sessão)
+
+
+def _versao_dados(db_path, conn):
+    """Impressão digital do banco: tamanho e mtime do arquivo mais contagem, maior id e
+    última coleta de cada tabela (cobre escritas que ainda estão no WAL)"""
+    try:
+        stat = os.stat(db_path)
+        arquivo = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        arquivo = None
+    tabelas = tuple(
+        conn.execute(f"SELECT COUNT(*), MAX(id), MAX(coletado_em) FROM {tabela}").fetchone()
+        for tabela in ('voos', 'aluguel_carros')
+    )
+    return arquivo, tabelas
+
+
+def versao_dados(db_path):
+    """Impressão digital atual do banco, a mesma usada nas chaves dos caches do engine
+    (None se o banco não puder ser lido)"""
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            return _versao_dados(db_path, conn)
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+
+
 class TripOptimizationProblem(Problem):
     """Problema de otimização de viagens usando NSGA-II"""
     
@@ -20,6 +82,17 @@ class TripOptimizationProblem(Problem):
         self.df_carros = df_carros
         self.config = config
         
+        # Vetores de custo e tempo pré-extraídos uma única vez (voos seguidos de carros),
+        # na mesma ordem das variáveis binárias
+        self.custos = np.concatenate([
+            df_voos['preco_numerico'].to_numpy(dtype=float),
+            df_carros['preco_numerico'].to_numpy(dtype=float)
+        ])
+        self.tempos = np.concatenate([
+            df_voos['duracao_min'].to_numpy(dtype=float),
+            df_carros['duracao_min'].to_numpy(dtype=float)
+        ])
+        
         # Total de variáveis binárias: uma para cada voo + uma para cada carro
         n_vars = len(df_voos) + len(df_carros)
         
@@ -28,107 +101,55 @@ class TripOptimizationProblem(Problem):
         # n_constr = número de restrições
         super().__init__(n_var=n_vars, n_obj=2, n_constr=1, xl=0, xu=1, type_var=bool)
         
-    def _decode_solution(self, x):
-        """Decodifica solução binária em voos e carros selecionados"""
-        n_voos = len(self.df_voos)
-        voos_sel = x[:n_voos]
-        carros_sel = x[n_voos:]
-        return voos_sel, carros_sel
+    def _calculate_objectives(self, X):
+        """Calcula custo e tempo total de uma solução ou de uma população inteira (X @ custos)"""
+        X = np.asarray(X, dtype=float)
+        return X @ self.custos, X @ self.tempos
     
-    def _calculate_objectives(self, voos_sel, carros_sel):
-        """Calcula custo e tempo total"""
-        custo = 0
-        tempo = 0
-        
-        for i, selected in enumerate(voos_sel):
-            if selected:
-                custo += self.df_voos.iloc[i]['preco_numerico']
-                tempo += self.df_voos.iloc[i]['duracao_min']
-        
-        for j, selected in enumerate(carros_sel):
-            if selected:
-                custo += self.df_carros.iloc[j]['preco_numerico']
-                tempo += self.df_carros.iloc[j]['duracao_min']
-        
-        return custo, tempo
-    
-    def _check_constraints(self, voos_sel, carros_sel):
-        """Verifica se a solução respeita as restrições - retorna penalidade"""
-        origem = self.config['origem']
-        destinos = self.config['destinos']
+    def _check_constraints(self, custos):
+        """Penalidade por exceder o orçamento, calculada a partir dos custos já avaliados"""
         budget = self.config['budget']
         
-        # Calcular custo total
-        custo_total, _ = self._calculate_objectives(voos_sel, carros_sel)
-        
         # Penalidade por exceder orçamento (peso grande)
-        budget_violation = max(0, custo_total - budget) * 10
-        
         # Para gerar diversidade no Pareto Front, vamos relaxar as restrições
         # e apenas garantir que o custo não exceda muito o orçamento
         # As outras restrições serão tratadas na filtragem final
-        
-        return budget_violation
+        return np.maximum(0, custos - budget) * 10
     
     def _evaluate(self, x, out, *args, **kwargs):
         """Avalia uma população de soluções considerando alpha do usuário"""
-        f1 = []  # Custo
-        f2 = []  # Tempo
-        g1 = []  # Restrições
-        
-        # Coletar todos custos e tempos para normalização
-        custos_raw = []
-        tempos_raw = []
-        
-        for solution in x:
-            voos_sel, carros_sel = self._decode_solution(solution)
-            custo, tempo = self._calculate_objectives(voos_sel, carros_sel)
-            custos_raw.append(custo)
-            tempos_raw.append(tempo)
+        # Custos e tempos de toda a população em uma única operação matricial
+        custos_raw, tempos_raw = self._calculate_objectives(np.atleast_2d(x))
         
         # Normalizar
-        min_c = min(custos_raw) if custos_raw else 1
-        max_c = max(custos_raw) if custos_raw else 1
-        min_t = min(tempos_raw) if tempos_raw else 1
-        max_t = max(tempos_raw) if tempos_raw else 1
+        min_c, max_c = custos_raw.min(), custos_raw.max()
+        min_t, max_t = tempos_raw.min(), tempos_raw.max()
         
         range_c = max_c - min_c if max_c > min_c else 1
         range_t = max_t - min_t if max_t > min_t else 1
         
         alpha = self.config.get('alpha', 0.5)
         
-        for i, solution in enumerate(x):
-            voos_sel, carros_sel = self._decode_solution(solution)
-            custo = custos_raw[i]
-            tempo = tempos_raw[i]
-            constraint_violation = self._check_constraints(voos_sel, carros_sel)
-            
-            # Normalizar
-            custo_norm = (custo - min_c) / range_c if range_c > 0 else 0
-            tempo_norm = (tempo - min_t) / range_t if range_t > 0 else 0
-            
-            # Aplicar alpha: quanto maior alpha, mais peso no custo
-            # F1: objetivo ponderado pelo alpha (PRINCIPAL)
-            # F2: mantemos objetivos separados para visualização do Pareto
-            obj_ponderado = alpha * custo_norm + (1 - alpha) * tempo_norm
-            
-            f1.append(obj_ponderado * 1000)  # Multiplicar para escala
-            f2.append(tempo)  # Manter tempo real para segunda dimensão
-            g1.append(constraint_violation)
+        custo_norm = (custos_raw - min_c) / range_c
+        tempo_norm = (tempos_raw - min_t) / range_t
+        
+        # Aplicar alpha: quanto maior alpha, mais peso no custo
+        # F1: objetivo ponderado pelo alpha (PRINCIPAL)
+        # F2: mantemos objetivos separados para visualização do Pareto
+        obj_ponderado = alpha * custo_norm + (1 - alpha) * tempo_norm
         
-        out["F"] = np.column_stack([f1, f2])
-        out["G"] = np.column_stack([g1])
+        out["F"] = np.column_stack([obj_ponderado * 1000, tempos_raw])  # Multiplicar para escala
+        out["G"] = np.column_stack([self._check_constraints(custos_raw)])
 
 
 class TripOptimizerEngine:
     def __init__(self, db_path, config):
         self.db_path = db_path
         self.config = config  # {origem: 'BSB', destinos: ['ATL'], budget: 15000, alpha: 0.7}
-        # Carregar coordenadas para estimativa de carros
-        try:
-            self.df_airports = pd.read_csv('utils/br-us-airports.csv', sep=';')
-        except:
-            self.df_airports = pd.DataFrame()
+        self._pools = OrderedDict()  # (configuração sem alpha, versão dos dados) -> (pool, erros)
+        self._pool_atual = None
+        self.fronteira_sweep = []  # Candidatos referenciados pela coluna 'solucao' de sweep()
+        self.metadados = Diagnostico()  # Tempos e contadores por fase da última execução
     
     def _validate_itinerary(self, itinerario):
         """Valida se o itinerário é válido (visita todos os destinos)"""
@@ -159,651 +180,987 @@ class TripOptimizerEngine:
         
         return True
 
-    def _get_minutes(self, duration_str):
-        """Converte '6h 20m' para minutos inteiros."""
-        if not isinstance(duration_str, str) or pd.isna(duration_str):
-            return 0
-        try:
-            hours = re.search(r'(\d+)h', str(duration_str))
-            minutes = re.search(r'(\d+)m', str(duration_str))
-            h = int(hours.group(1)) if hours else 0
-            m = int(minutes.group(1)) if minutes else 0
-            return h * 60 + m
-        except:
-            return 0
+    def _minutos_coluna(self, df, coluna_texto, coluna_minutos):
+        """Minutos já gravados pelo scraper; linhas antigas (sem a coluna numérica) são convertidas do texto"""
+        if coluna_minutos in df.columns:
+            numerica = pd.to_numeric(df[coluna_minutos], errors='coerce')
+            if numerica.notna().all():
+                return numerica.astype(int)
+            return numerica.fillna(minutos_serie(df[coluna_texto])).astype(int)
+        return minutos_serie(df[coluna_texto])
 
-    def _estimate_car_duration(self, orig, dest):
-        """Estima tempo de carro baseado na distância entre aeroportos."""
-        try:
-            coords = self.df_airports.set_index('iata_code')
-            lat1, lon1 = coords.loc[orig, ['latitude_deg', 'longitude_deg']]
-            lat2, lon2 = coords.loc[dest, ['latitude_deg', 'longitude_deg']]
-            
-            lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-            dlon = lon2 - lon1 
-            dlat = lat2 - lat1 
-            a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-            c = 2 * asin(sqrt(a)) 
-            km = 6371 * c
-            
-            # Velocidade média: 85 km/h
-            total_min = int((km / 85) * 60)
-            return f"{total_min // 60}h {total_min % 60}m", total_min
-        except:
-            return "4h 00m", 240  # Default de segurança
+    def _estimate_car_durations(self, origens, destinos):
+        """Estima o tempo de carro de cada par pela distância entre aeroportos (vetorizado)."""
+        lat1, lon1 = coordenadas(origens)
+        lat2, lon2 = coordenadas(destinos)
+        km = haversine_km(lat1, lon1, lat2, lon2)
+        
+        # Velocidade média: 85 km/h; aeroportos sem coordenadas usam o default de segurança
+        conhecido = np.isfinite(km)
+        total_min = np.where(conhecido, np.floor(np.where(conhecido, km, 0) / 85 * 60), 240).astype(int)
+        duracao = [
+            f"{m // 60}h {m % 60}m" if ok else "4h 00m"
+            for m, ok in zip(total_min.tolist(), conhecido.tolist())
+        ]
+        return duracao, total_min
 
     def load_and_filter_data(self):
         conn = sqlite3.connect(self.db_path)
-        permitidas = [self.config['origem']] + self.config['destinos']
-        
-        # Filtro estrito para evitar cidades não selecionadas
-        self.df_voos = pd.read_sql_query(
-            f"SELECT * FROM voos WHERE origem IN {tuple(permitidas)} AND destino IN {tuple(permitidas)}", conn)
-        self.df_carros = pd.read_sql_query(
-            f"SELECT * FROM aluguel_carros WHERE local_retirada IN {tuple(permitidas)} AND local_entrega IN {tuple(permitidas)}", conn)
-        conn.close()
-
+        permitidas = self.config.get('origens', [self.config['origem']]) + self.config['destinos']
+        
+        try:
+            with self.metadados.fase('leitura_sqlite'):
+                try:
+                    migrar(conn)  # Colunas de minutos e índices por trecho
+                except sqlite3.OperationalError as e:
+                    # Banco somente leitura: as consultas abaixo funcionam sem os índices
+                    logger.warning("Não foi possível migrar o esquema de %s: %s", self.db_path, e)
+                
+                # Dados já processados para os mesmos aeroportos e a mesma versão do banco
+                usar_cache = self.config.get('cache_dados', True)
+                self._versao = _versao_dados(self.db_path, conn)
+                chave = (os.path.abspath(self.db_path), frozenset(permitidas), self._versao)
+                if usar_cache and chave in _cache_dados:
+                    _cache_dados.move_to_end(chave)
+                    (self.df_voos, self.df_carros, self._n_voos, self._custos, self._tempos,
+                     self._chaves_oferta, self._segmentos) = _cache_dados[chave]
+                    logger.debug("Dados carregados do cache para %s", sorted(permitidas))
+                    self.metadados.contar('cache_dados')
+                    self._preparar_horarios()
+                    return
+                
+                # Filtro estrito para evitar cidades não selecionadas (usa os índices por trecho)
+                marcadores = ', '.join('?' * len(permitidas))
+                self.df_voos = pd.read_sql_query(
+                    f"SELECT * FROM voos WHERE origem IN ({marcadores}) AND destino IN ({marcadores})",
+                    conn, params=permitidas * 2)
+                self.df_carros = pd.read_sql_query(
+                    f"SELECT * FROM aluguel_carros WHERE local_retirada IN ({marcadores}) AND local_entrega IN ({marcadores})",
+                    conn, params=permitidas * 2)
+        finally:
+            conn.close()
+        self.metadados.contar('linhas_voos', len(self.df_voos))
+        self.metadados.contar('linhas_carros', len(self.df_carros))
+        
+        self._processar_dados()
+        self._preparar_horarios()
+        
+        if usar_cache:
+            _cache_dados[chave] = (self.df_voos, self.df_carros, self._n_voos, self._custos, self._tempos,
+                                   self._chaves_oferta, self._segmentos)
+            while len(_cache_dados) > _CACHE_MAX_ENTRADAS:
+                _cache_dados.popitem(last=False)
+    
+    def _processar_dados(self):
+        """Durações, vetores de custo/tempo, chaves de deduplicação e índice de segmentos"""
         # Processar durações dos voos
         # A tabela tem ida_duracao e volta_duracao, precisamos combinar
-        def calcular_duracao_total(row):
-            """Calcula duração total combinando ida e volta se existir"""
-            ida_min = self._get_minutes(row.get('ida_duracao', ''))
-            volta_min = self._get_minutes(row.get('volta_duracao', '')) if pd.notna(row.get('volta_duracao')) else 0
-            return ida_min + volta_min
-        
-        # Criar coluna duracao_min com a soma de ida e volta
-        self.df_voos['duracao_min'] = self.df_voos.apply(calcular_duracao_total, axis=1)
-        
-        # Criar coluna duracao formatada para exibição
-        def formatar_duracao(row):
-            """Formata duração para exibição"""
-            ida = row.get('ida_duracao', 'N/A')
-            volta = row.get('volta_duracao', None)
-            if pd.notna(volta) and volta:
-                return f"{ida} + {volta}"
-            return str(ida)
-        
-        self.df_voos['duracao'] = self.df_voos.apply(formatar_duracao, axis=1)
+        with self.metadados.fase('duracoes_voos'):
+            ida_min = self._minutos_coluna(self.df_voos, 'ida_duracao', 'ida_duracao_min')
+            volta_min = self._minutos_coluna(self.df_voos, 'volta_duracao', 'volta_duracao_min')
+            
+            # Criar coluna duracao_min com a soma de ida e volta
+            self.df_voos['duracao_min'] = ida_min + volta_min
+            
+            # Criar coluna duracao formatada para exibição
+            ida = self.df_voos['ida_duracao'].astype(str)
+            volta = self.df_voos['volta_duracao']
+            tem_volta = volta.notna() & volta.astype(bool)
+            self.df_voos['duracao'] = ida.where(~tem_volta, ida + " + " + volta.astype(str))
         
         # Processar durações dos carros
-        for idx, row in self.df_carros.iterrows():
-            d_str, d_min = self._estimate_car_duration(row['local_retirada'], row['local_entrega'])
-            self.df_carros.at[idx, 'duracao'] = d_str
-            self.df_carros.at[idx, 'duracao_min'] = d_min
+        with self.metadados.fase('estimativa_carros'):
+            duracao, duracao_min = self._estimate_car_durations(self.df_carros['local_retirada'], self.df_carros['local_entrega'])
+            self.df_carros['duracao'] = duracao
+            self.df_carros['duracao_min'] = duracao_min.astype(float)
+        
+        with self.metadados.fase('indices'):
+            # Vetores indexados pelo ID global da oferta e chaves de conteúdo para deduplicação
+            self._n_voos = len(self.df_voos)
+            self._custos, self._tempos = self._offer_vectors()
+            self._chaves_oferta = self._content_keys()
+            
+            # Índice (origem, destino) -> ofertas, consultado por todas as rotas e padrões
+            self._segmentos = SegmentIndex.from_frames(self.df_voos, self.df_carros, self._custos, self._tempos)
+    
+    def _preparar_horarios(self):
+        """Janelas de partida por segmento, montadas só quando config['horarios'] pede.
+        
+        Ficam no SegmentIndex, que é compartilhado pelo cache de dados, então são montadas
+        uma vez por conjunto de dados.
+        """
+        if not self.config.get('horarios') or self._segmentos.horarios is not None:
+            return
+        with self.metadados.fase('grade_horarios'):
+            ida_min = self._minutos_coluna(self.df_voos, 'ida_duracao', 'ida_duracao_min')
+            self._segmentos.horarios = GradeHorarios.from_frames(self.df_voos, self.df_carros, ida_min)
+    
+    def _content_keys(self):
+        """Chave inteira por oferta: ofertas com o mesmo conteúdo relevante recebem a mesma chave"""
+        def valor(v):
+            return '' if v is None or (isinstance(v, float) and np.isnan(v)) else v
+        
+        def colunas(df, nomes):
+            return [df[n].tolist() if n in df.columns else [''] * len(df) for n in nomes]
+        
+        linhas = list(zip(
+            *colunas(self.df_voos, ['origem', 'destino', 'companhia', 'data_ida', 'ida_duracao', 'volta_duracao']),
+            ['Voo'] * len(self.df_voos),
+            self.df_voos['preco_numerico'].round(2).tolist()
+        )) + list(zip(
+            *colunas(self.df_carros, ['local_retirada', 'local_entrega', 'locadora', 'data_inicio', 'ida_duracao', 'volta_duracao']),
+            ['Carro'] * len(self.df_carros),
+            self.df_carros['preco_numerico'].round(2).tolist()
+        ))
+        
+        chaves = {}
+        return np.array([chaves.setdefault(tuple(valor(v) for v in linha), len(chaves)) for linha in linhas], dtype=int)
 
-    def solve(self):
+    def solve(self, retornar_metadados=False):
+        """Soluções ordenadas pelo alpha (ou código de erro / None).
+        
+        Tempos e contadores de cada fase ficam em self.metadados; com retornar_metadados=True
+        o retorno é a tupla (resultado, metadados). Cada chamada é acrescentada ao log de
+        execuções (backend/registro.py), a menos que config['log_execucoes'] seja False.
+        """
+        self.metadados = Diagnostico()
+        resultado = self._solve()
+        self.metadados.encerrar()
+        if isinstance(resultado, str):
+            self._registrar('solve', 0, erro=resultado)
+        else:
+            self._registrar('solve', len(resultado) if resultado else 0)
+        return (resultado, self.metadados) if retornar_metadados else resultado
+    
+    def _solve(self):
         self.load_and_filter_data()
         
+        erro = self._verificar_origem(self.config['origem'])
+        if erro:
+            return erro
+        
+        final_solutions = self._selecionar(self._gerar_origens([self.config['origem']]))
+        
+        # Montar os DataFrames de itinerário apenas para as soluções retornadas
+        if final_solutions:
+            return self._materializar_todas(final_solutions)
+        return None
+    
+    def _materializar_todas(self, solucoes):
+        with self.metadados.fase('materializacao'):
+            return [self._materializar(sol) for sol in solucoes]
+    
+    def solve_multi(self, origens):
+        """Resolve várias origens com uma única carga dos dados e um único ranking.
+        
+        O banco é lido uma vez para a união das origens e destinos, e o índice de segmentos
+        é compartilhado entre as origens. Os candidatos de todas as origens passam juntos por
+        deduplicação, orçamento, Pareto e ordenação pelo alpha.
+        
+        Returns:
+            (soluções, erros): lista de soluções como em solve() (ou None) e dict
+            origem -> código de erro ('ERRO_SEM_DADOS', 'ERRO_SEM_RETORNO') das origens ignoradas
+        """
+        origens = list(origens)
+        config_original = self.config
+        self.config = dict(self.config, origens=origens, origem=origens[0])
+        self.metadados = Diagnostico()
+        try:
+            self.load_and_filter_data()
+            
+            erros = {}
+            for origem in origens:
+                erro = self._verificar_origem(origem)
+                if erro:
+                    erros[origem] = erro
+            
+            candidatos = self._gerar_origens([origem for origem in origens if origem not in erros])
+            final_solutions = self._selecionar(candidatos)
+            solucoes = self._materializar_todas(final_solutions) if final_solutions else None
+            self.metadados.encerrar()
+            self._registrar('solve_multi', len(solucoes) if solucoes else 0,
+                            erro=','.join(sorted(set(erros.values()))) or None)
+        finally:
+            self.config = config_original
+        return solucoes, erros
+    
+    def solve_iter(self, tempo_limite=None, origens=None, intervalo=0.25):
+        """Versão incremental de solve_multi(): gera fotografias da melhor seleção até agora.
+        
+        As rotas (ou a DP por subconjuntos) de cada origem são processadas uma a uma; depois
+        de cada uma, se a seleção mudou e já passou `intervalo` segundos desde a última
+        fotografia, uma nova é emitida. Com `tempo_limite` (segundos de relógio) as rotas
+        restantes são puladas quando o tempo acaba e a última fotografia traz o melhor
+        resultado parcial. Uma rota em andamento não é interrompida. O intervalo entre
+        fotografias cresce com o custo de montá-las, então o tempo extra fica limitado.
+        
+        Yields:
+            dict com 'solucoes' (como em solve(), ou None), 'erros' (por origem),
+            'rotas_processadas', 'rotas_total', 'completo' e 'tempo_s'
+        
+        Em self.metadados, fases e contadores de seleção somam todas as fotografias.
+        """
+        inicio = time.perf_counter()
+        origens = list(origens or [self.config['origem']])
+        config_original = self.config
+        self.config = dict(self.config, origens=origens, origem=origens[0])
+        try:
+            self.metadados = Diagnostico()
+            self.load_and_filter_data()
+        
+            erros = {}
+            for origem in origens:
+                erro = self._verificar_origem(origem)
+                if erro:
+                    erros[origem] = erro
+            validas = [origem for origem in origens if origem not in erros]
+            tarefas = [tarefa for origem in validas for tarefa in self._tarefas_origem(origem)]
+            self.metadados.contar('rotas_viaveis', sum(rota is not None for _, _, rota in tarefas))
+        
+            por_origem = {origem: [] for origem in validas}
+            materializados = {}  # Itinerários já montados, reaproveitados entre fotografias
+            ultima = {'selecao': None, 'instante': -np.inf, 'custo': 0.0}
+        
+            def fotografia(processadas, completo, forcar=False):
+                # A seleção é refeita no máximo uma vez por intervalo, e o intervalo cresce com o
+                # custo da última fotografia para que elas não passem de ~20% do tempo total
+                antes = time.perf_counter()
+                if not forcar and antes - ultima['instante'] < max(intervalo, 4 * ultima['custo']):
+                    return None
+                candidatos = [sol for origem in validas for sol in por_origem[origem]]
+                selecao = self._selecionar(candidatos) if candidatos else None
+                self.metadados.contar('fotografias')
+                assinatura = tuple(sol.ofertas for sol in selecao) if selecao else None
+                agora = time.perf_counter()
+                ultima['instante'] = agora
+                if not forcar and assinatura == ultima['selecao']:
+                    return None
+                ultima['selecao'] = assinatura
+                solucoes = None
+                if selecao:
+                    solucoes = []
+                    with self.metadados.fase('materializacao'):
+                        for sol in selecao:
+                            if sol.ofertas not in materializados:
+                                materializados[sol.ofertas] = self._materializar(sol)
+                            solucoes.append(dict(materializados[sol.ofertas]))
+                ultima['custo'] = time.perf_counter() - antes
+                return {
+                    'solucoes': solucoes,
+                    'erros': erros,
+                    'rotas_processadas': processadas,
+                    'rotas_total': len(tarefas),
+                    'completo': completo,
+                    'tempo_s': agora - inicio,
+                }
+        
+            processadas = 0
+            for tarefa in tarefas:
+                if tempo_limite is not None and time.perf_counter() - inicio >= tempo_limite:
+                    logger.info("Tempo limite de %.2fs atingido após %d de %d rotas",
+                                tempo_limite, processadas, len(tarefas))
+                    break
+                with self.metadados.fase('geracao'):
+                    origem, resultados = executar(tarefa, self._segmentos, self._custos, self._tempos, self.config)
+                    por_origem[origem].extend(self._candidatos(resultados))
+                self.metadados.contar('candidatos_gerados', len(resultados))
+                processadas += 1
+                parcial = fotografia(processadas, completo=False)
+                if parcial is not None:
+                    yield parcial
+        
+            completo = processadas == len(tarefas)
+            if completo:
+                # Mesmo fallback de _gerar_candidatos, só quando todas as rotas foram processadas
+                for origem in validas:
+                    if len(por_origem[origem]) < 2 and not self._muitos_destinos():
+                        if tempo_limite is not None and time.perf_counter() - inicio >= tempo_limite:
+                            completo = False
+                            break
+                        self.config['origem'] = origem
+                        por_origem[origem].extend(self._solve_with_nsga2())
+        
+            final = fotografia(processadas, completo=completo, forcar=True)
+            self.metadados.encerrar()
+            yield final
+        finally:
+            self.config = config_original
+    
+    def preparar_pool(self, origens=None):
+        """Pool de candidatos independente do alpha, reaproveitado enquanto origens, destinos,
+        orçamento e dados do banco não mudam.
+        
+        A geração usa o modo exato (ou a DP por subconjuntos), cuja fronteira não depende do
+        alpha; depois disso mudar a prioridade é só ranquear(alpha), sem gerar rotas de novo.
+        
+        Returns:
+            (pool, erros): PoolCandidatos (ou None se nada couber no orçamento) e o dict de
+            erros por origem, como em solve_multi()
+        """
+        origens = list(origens or [self.config['origem']])
+        config_original = self.config
+        self.config = self._config_sem_alpha(origens)
+        self.metadados = Diagnostico()
+        try:
+            self.load_and_filter_data()
+            chave = (
+                tuple(sorted((k, repr(v)) for k, v in self.config.items() if k not in ('origem', 'alpha'))),
+                self._versao,
+            )
+            if chave not in self._pools:
+                candidatos, erros = self._gerar_sem_alpha(origens)
+                fronteira = self._fronteira(candidatos)
+                # A cópia rasa mantém os DataFrames desta carga para materializar depois
+                pool = PoolCandidatos(fronteira, copy.copy(self)._materializar) if fronteira else None
+                self._pools[chave] = (pool, erros)
+                while len(self._pools) > _POOLS_MAX_ENTRADAS:
+                    self._pools.popitem(last=False)
+                logger.debug("Pool de candidatos calculado: %d soluções", len(pool) if pool else 0)
+            else:
+                self._pools.move_to_end(chave)
+                self.metadados.contar('pool_reaproveitado')
+            
+            self._pool_atual, erros = self._pools[chave]
+            self.metadados.encerrar()
+            self._registrar('pool', len(self._pool_atual) if self._pool_atual else 0,
+                            erro=','.join(sorted(set(erros.values()))) or None)
+        finally:
+            self.config = config_original
+        return self._pool_atual, erros
+    
+    def sweep(self, orcamentos, alphas, origens=None):
+        """Sensibilidade a orçamento e alpha a partir de uma única fronteira.
+        
+        As ofertas são geradas uma vez com o maior orçamento, como em preparar_pool(). Os
+        cortes por orçamento são prefixos da fronteira ordenada por custo. A escolha segue a
+        primeira posição de solve() no modo exato: com alpha >= 0.7 é o ponto mais barato do
+        prefixo, com alpha <= 0.3 o mais rápido (o último), e entre os dois o ótimo de
+        alpha * custo_norm + (1 - alpha) * tempo_norm, que vem da envoltória convexa inferior
+        de cada prefixo (backend/pareto.py), sem um solve por combinação. A normalização usa
+        os intervalos da lista que _fronteira() monta para cada orçamento, a mesma que
+        solve() ordena. Com config['pareto_epsilon'] solve() escolhe só entre os pontos do
+        arquivo epsilon, e a escolha pode diferir.
+        
+        Returns:
+            DataFrame com uma linha por (orcamento, alpha): 'solucao' (posição em
+            self.fronteira_sweep, -1 quando nada cabe no orçamento), 'ofertas' (IDs
+            globais das ofertas), 'custo' e 'tempo'
+        """
+        orcamentos = [float(b) for b in orcamentos]
+        alphas = [float(a) for a in alphas]
+        origens = list(origens or [self.config['origem']])
+        
+        config_original = self.config
+        self.config = self._config_sem_alpha(origens, budget=max(orcamentos))
+        self.metadados = Diagnostico()
+        try:
+            self.load_and_filter_data()
+            candidatos, _ = self._gerar_sem_alpha(origens)
+        finally:
+            self.config = config_original
+        
+        # Fronteira estrita (sem empates nem vizinhos) dentro do maior orçamento
+        unicos = [sol for sol in self._deduplicar(candidatos) if sol.custo <= max(orcamentos)]
+        with self.metadados.fase('pareto'):
+            custos = np.array([sol.custo for sol in unicos], dtype=float)
+            tempos = np.array([sol.tempo for sol in unicos], dtype=float)
+            fronteira = nao_dominados(custos, tempos)
+        self.fronteira_sweep = [unicos[i] for i in fronteira]
+        cortes = np.searchsorted(custos[fronteira], orcamentos, side='right')
+        
+        # solve() normaliza o score pelos intervalos da lista de _fronteira (com empates e,
+        # em fronteiras pequenas, vizinhos), que muda com o orçamento
+        intervalos = np.ones((len(orcamentos), 2))
+        for b, orcamento in enumerate(orcamentos):
+            if cortes[b]:
+                lista = self._fronteira(candidatos, orcamento)
+                intervalos[b] = (np.ptp([sol.custo for sol in lista]) or 1,
+                                 np.ptp([sol.tempo for sol in lista]) or 1)
+        
+        with self.metadados.fase('otimos_ponderados'):
+            alphas_array = np.array(alphas)
+            economia, velocidade = alphas_array >= 0.7, alphas_array <= 0.3
+            balanceado = ~(economia | velocidade)
+            escolhas = np.full((len(orcamentos), len(alphas)), -1, dtype=int)
+            escolhas[:, balanceado] = otimos_ponderados(
+                custos[fronteira], tempos[fronteira], orcamentos, alphas_array[balanceado], intervalos)
+            # Nos extremos solve() ordena só por custo ou só por tempo
+            for b, fim in enumerate(cortes):
+                if fim:
+                    escolhas[b, economia] = 0
+                    escolhas[b, velocidade] = fim - 1
+        self.metadados.encerrar()
+        linhas = []
+        for b, orcamento in enumerate(orcamentos):
+            for a, alpha in enumerate(alphas):
+                i = int(escolhas[b, a])
+                sol = self.fronteira_sweep[i] if i >= 0 else None
+                linhas.append({
+                    'orcamento': orcamento,
+                    'alpha': alpha,
+                    'solucao': i,
+                    'ofertas': sol.ofertas if sol else (),
+                    'custo': sol.custo if sol else np.nan,
+                    'tempo': sol.tempo if sol else np.nan,
+                })
+        return pd.DataFrame(linhas, columns=['orcamento', 'alpha', 'solucao', 'ofertas', 'custo', 'tempo'])
+    
+    def _registrar(self, operacao, n_solucoes, erro=None):
+        """Acrescenta a execução atual (self.metadados) ao log persistente de latência"""
+        caminho = caminho_log(self.db_path, self.config)
+        if caminho is None:
+            return
+        modo = 'subconjuntos' if self._muitos_destinos() else self.config.get('route_mode', 'amostragem')
+        registrar(caminho, operacao, self.config, self._versao, self.metadados,
+                  len(self.df_voos) + len(self.df_carros), n_solucoes, erro=erro, modo=modo)
+    
+    def _config_sem_alpha(self, origens, **extra):
+        """Configuração de geração que não depende do alpha (fronteira exata por rota ou DP)"""
+        return dict(self.config, origens=origens, origem=origens[0], route_mode='exato', alpha=0.5, **extra)
+    
+    def _gerar_sem_alpha(self, origens):
+        """Candidatos das origens válidas com a configuração atual; retorna (candidatos, erros)"""
+        erros = {}
+        for origem in origens:
+            erro = self._verificar_origem(origem)
+            if erro:
+                erros[origem] = erro
+        return self._gerar_origens([origem for origem in origens if origem not in erros]), erros
+    
+    def ranquear(self, alpha, n=50):
+        """Top-n soluções do último pool para o alpha, sem recalcular rotas (None sem pool)"""
+        if self._pool_atual is None:
+            return None
+        return self._pool_atual.ranquear(alpha, n)
+    
+    def _verificar_origem(self, origem):
+        """Código de erro quando não há dados ou não há voos de volta para a origem"""
         # Verificar se há dados
         if self.df_voos.empty:
             return "ERRO_SEM_DADOS"
         
-        if self.df_voos[self.df_voos['destino'] == self.config['origem']].empty:
+        # Só voos vindos dos destinos contam como volta: com várias origens os dados incluem
+        # os trechos entre origens, que não fecham o roteiro
+        volta = (self.df_voos['destino'] == origem) & self.df_voos['origem'].isin(self.config['destinos'])
+        if not volta.any():
             return "ERRO_SEM_RETORNO"
-
+        return None
+    
+    def _muitos_destinos(self):
+        return len(self.config['destinos']) > self.config.get('max_destinos_permutacao', 5)
+    
+    def _gerar_origens(self, origens):
+        """Candidatos de várias origens; com config['workers'] > 1 as rotas são geradas em processos"""
+        workers = self.config.get('workers') or 1
+        if workers > 1:
+            return self._gerar_em_paralelo(origens, workers)
+        
+        solutions = []
+        origem_original = self.config['origem']
+        try:
+            for origem in origens:
+                # Os geradores leem a origem da configuração
+                self.config['origem'] = origem
+                solutions.extend(self._gerar_candidatos())
+        finally:
+            self.config['origem'] = origem_original
+        return solutions
+    
+    def _gerar_candidatos(self):
+        """Candidatos da origem atual da configuração, com o NSGA-II como fallback"""
         # Ao invés de usar NSGA-II que pode convergir para uma única solução,
         # vamos gerar múltiplas soluções manualmente explorando diferentes combinações
-        solutions = self._generate_alternative_routes()
+        # route_mode 'exato' calcula a fronteira completa de cada rota por rótulos não dominados;
+        # com muitos destinos as ordens não são enumeradas e a fronteira vem da DP por subconjuntos
+        muitos_destinos = self._muitos_destinos()
+        with self.metadados.fase('geracao'):
+            if muitos_destinos:
+                solutions = self._generate_subset_routes()
+            elif self.config.get('route_mode', 'amostragem') == 'exato':
+                solutions = self._generate_exact_routes()
+            else:
+                solutions = self._generate_alternative_routes()
+        self.metadados.contar('candidatos_gerados', len(solutions))
         
         # Se não conseguimos gerar alternativas manualmente, tentar com NSGA-II
-        if not solutions or len(solutions) < 2:
+        # (o NSGA-II enumera as rotas, então não é usado quando há muitos destinos)
+        if (not solutions or len(solutions) < 2) and not muitos_destinos:
             solutions_ga = self._solve_with_nsga2()
             if solutions_ga:
                 solutions.extend(solutions_ga)
+        return solutions
+    
+    def _selecionar(self, solutions):
+        """Deduplica, aplica o orçamento, extrai a fronteira e ordena pelo alpha (até 50 candidatos)"""
+        pareto_front = self._fronteira(solutions)
+        if not pareto_front:
+            return None
+        
+        alpha = self.config.get('alpha', 0.5)
+        if alpha >= 0.7:
+            logger.debug("Modo ECONOMIA (alpha=%.2f) - Ordenando por CUSTO", alpha)
+        elif alpha <= 0.3:
+            logger.debug("Modo VELOCIDADE (alpha=%.2f) - Ordenando por TEMPO", alpha)
+        else:
+            logger.debug("Modo BALANCEADO (alpha=%.2f) - Ordenando por SCORE", alpha)
+        
+        # Mesma ordenação usada pelo pool de candidatos, para que solve() e ranquear() concordem
+        with self.metadados.fase('ordenacao'):
+            final_solutions = PoolCandidatos(pareto_front).selecionar(alpha, 50)
+        self.metadados.contar('retornadas', len(final_solutions))
+        logger.debug("Retornando %d soluções", len(final_solutions))
+        
+        # As tabelas de diagnóstico só são calculadas quando o nível DEBUG está habilitado
+        if logger.isEnabledFor(logging.DEBUG):
+            self._log_ordenacao(final_solutions, alpha)
+            self._log_tabela_final(final_solutions)
+        
+        return final_solutions
+    
+    def _fronteira(self, solutions, budget=None):
+        """Deduplica, aplica o orçamento (padrão: config['budget']) e extrai a fronteira
+        (completada com vizinhos se for pequena)"""
+        if not solutions:
+            return None
         
         # Remover duplicatas e ordenar por custo E TEMPO (Pareto Front)
-        if solutions:
-            print(f"DEBUG: Total de soluções antes de remover duplicatas: {len(solutions)}")
+        unique_solutions = self._deduplicar(solutions)
+        
+        # FILTRAR soluções que excedem o orçamento máximo
+        budget_max = self.config['budget'] if budget is None else budget
+        with self.metadados.fase('orcamento'):
+            within_budget = [sol for sol in unique_solutions if sol.custo <= budget_max]
+        self.metadados.contar('podados_orcamento', len(unique_solutions) - len(within_budget))
+        
+        if not within_budget:
+            logger.warning(
+                "Nenhuma solução encontrada dentro do orçamento de R$ %.2f (mais barata custa R$ %.2f)",
+                budget_max, min(s.custo for s in unique_solutions)
+            )
+            # Retornar None quando não há soluções dentro do orçamento
+            return None
+        
+        logger.debug("%d soluções dentro do orçamento de R$ %.2f", len(within_budget), budget_max)
+        unique_solutions = within_budget
+        
+        # CALCULAR PARETO FRONT - Soluções não dominadas (varredura ordenada por custo)
+        with self.metadados.fase('pareto'):
+            custos_sol = np.array([sol.custo for sol in unique_solutions], dtype=float)
+            tempos_sol = np.array([sol.tempo for sol in unique_solutions], dtype=float)
             
-            # Criar uma chave única baseada em TODAS as características relevantes
-            unique_solutions = []
-            seen_routes = set()
+            epsilon = self.config.get('pareto_epsilon')
+            if epsilon:
+                # Arquivo com grade epsilon (custo R$, tempo min) para limitar o tamanho da fronteira
+                arquivo = ParetoArchive(epsilon=epsilon)
+                arquivo.extend(custos_sol, tempos_sol)
+                pareto_idx = np.array(sorted(arquivo.itens()), dtype=int)
+            else:
+                pareto_idx = np.sort(nao_dominados(custos_sol, tempos_sol, manter_empates=True))
+            pareto_front = [unique_solutions[i] for i in pareto_idx]
             
+            logger.debug("Pareto Front tem %d soluções não-dominadas", len(pareto_front))
+            
+            # Se Pareto Front for muito pequeno, adicionar até 30 soluções mais próximas dele
+            # (distância = custo + tempo normalizados pelos intervalos da fronteira)
+            if len(pareto_front) < 20:
+                proximos = proximos_da_fronteira(custos_sol, tempos_sol, pareto_idx, 30)
+                pareto_front.extend(unique_solutions[i] for i in proximos)
+        self.metadados.contar('podados_dominados', len(unique_solutions) - len(pareto_front))
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            self._log_padroes(pareto_front)
+        
+        return pareto_front
+    
+    def _deduplicar(self, solutions):
+        """Remove itinerários com o mesmo conteúdo, mantendo a primeira ocorrência"""
+        logger.debug("Total de soluções antes de remover duplicatas: %d", len(solutions))
+        
+        # Criar uma chave única baseada em TODAS as características relevantes
+        unique_solutions = []
+        seen_routes = set()
+        
+        with self.metadados.fase('deduplicacao'):
             for sol in solutions:
-                # Criar chave única baseada em múltiplos campos para evitar falsos positivos
-                route_parts = []
-                for _, row in sol['itinerario'].iterrows():
-                    # Incluir mais campos para diferenciar rotas similares
-                    part = (
-                        row.get('origem', ''),
-                        row.get('destino', ''),
-                        row.get('tipo', ''),
-                        row.get('companhia', ''),
-                        row.get('data_ida', ''),
-                        row.get('ida_duracao', ''),
-                        row.get('volta_duracao', ''),
-                        round(row.get('preco_numerico', 0), 2)
-                    )
-                    route_parts.append(part)
-                
-                route_key = tuple(route_parts)
+                # Chave única baseada no conteúdo de cada segmento (origem, destino, tipo, companhia,
+                # data, durações e preço), pré-calculada por oferta em _content_keys
+                route_key = tuple(self._chaves_oferta[i] for i in sol.ofertas)
                 
                 if route_key not in seen_routes:
                     seen_routes.add(route_key)
                     unique_solutions.append(sol)
-            
-            print(f"DEBUG: Soluções únicas após remover duplicatas exatas: {len(unique_solutions)}")
-            
-            # FILTRAR soluções que excedem o orçamento máximo
-            budget_max = self.config['budget']
-            within_budget = [sol for sol in unique_solutions if sol['custo'] <= budget_max]
-            
-            if not within_budget:
-                print(f"⚠️ AVISO: Nenhuma solução encontrada dentro do orçamento de R$ {budget_max:.2f}")
-                print(f"Solução mais barata custa R$ {min(s['custo'] for s in unique_solutions):.2f}")
-                # Retornar None quando não há soluções dentro do orçamento
-                return None
-            else:
-                print(f"DEBUG: {len(within_budget)} soluções dentro do orçamento de R$ {budget_max:.2f}")
-                unique_solutions = within_budget
-            
-            # CALCULAR PARETO FRONT - Soluções não dominadas
-            def domina(sol1, sol2):
-                """Verifica se sol1 domina sol2 (é melhor em pelo menos um objetivo e não pior em nenhum)"""
-                melhor_custo = sol1['custo'] <= sol2['custo']
-                melhor_tempo = sol1['tempo'] <= sol2['tempo']
-                estritamente_melhor = sol1['custo'] < sol2['custo'] or sol1['tempo'] < sol2['tempo']
-                return melhor_custo and melhor_tempo and estritamente_melhor
-            
-            # Encontrar soluções não dominadas (Pareto Front)
-            pareto_front = []
-            for sol in unique_solutions:
-                is_dominated = False
-                for other_sol in unique_solutions:
-                    if domina(other_sol, sol):
-                        is_dominated = True
-                        break
-                if not is_dominated:
-                    pareto_front.append(sol)
-            
-            print(f"\nDEBUG: Pareto Front tem {len(pareto_front)} soluções não-dominadas")
-            
-            # Se Pareto Front for muito pequeno, adicionar soluções próximas
-            if len(pareto_front) < 20:
-                # Adicionar soluções com pequena dominância
-                # Usar IDs para evitar comparação de DataFrames
-                pareto_ids = set(id(s) for s in pareto_front)
-                remaining = [s for s in unique_solutions if id(s) not in pareto_ids]
-                
-                # Ordenar por distância ao Pareto Front (soma normalizada de custo e tempo)
-                if pareto_front:
-                    min_custo = min(s['custo'] for s in pareto_front)
-                    max_custo = max(s['custo'] for s in pareto_front)
-                    min_tempo = min(s['tempo'] for s in pareto_front)
-                    max_tempo = max(s['tempo'] for s in pareto_front)
-                    
-                    range_custo = max_custo - min_custo if max_custo > min_custo else 1
-                    range_tempo = max_tempo - min_tempo if max_tempo > min_tempo else 1
-                    
-                    def distancia_pareto(sol):
-                        # Normalizar e calcular distância
-                        custo_norm = (sol['custo'] - min_custo) / range_custo
-                        tempo_norm = (sol['tempo'] - min_tempo) / range_tempo
-                        return custo_norm + tempo_norm
-                    
-                    remaining.sort(key=distancia_pareto)
-                    pareto_front.extend(remaining[:30])
-            
-            # Agrupar por padrão de tipos para garantir diversidade
-            from collections import defaultdict
-            solutions_by_pattern = defaultdict(list)
-            
-            for sol in pareto_front:
-                # Criar padrão de tipos
-                pattern = tuple(row['tipo'] for _, row in sol['itinerario'].iterrows())
-                solutions_by_pattern[pattern].append(sol)
-            
-            print(f"\nDEBUG: Padrões de tipo encontrados: {len(solutions_by_pattern)}")
-            for pattern, sols in sorted(solutions_by_pattern.items(), key=lambda x: min(s['custo'] for s in x[1])):
-                if sols:
-                    custos = [s['custo'] for s in sols]
-                    tempos = [s['tempo'] for s in sols]
-                    print(f"  {pattern}: {len(sols)} soluções")
-                    print(f"    Custo: R$ {min(custos):.2f} - R$ {max(custos):.2f}")
-                    print(f"    Tempo: {min(tempos):.0f} - {max(tempos):.0f} min")
-            
-            # NOVA ABORDAGEM: Selecionar baseado em TODAS as soluções globalmente
-            # Não processar por padrão, processar tudo junto para respeitar o alpha
-            all_solutions = pareto_front  # Usar todas as soluções do Pareto Front
-            
-            alpha = self.config.get('alpha', 0.5)
-            
-            # Calcular ranges globais
-            if all_solutions:
-                min_c_all = min(s['custo'] for s in all_solutions)
-                max_c_all = max(s['custo'] for s in all_solutions)
-                min_t_all = min(s['tempo'] for s in all_solutions)
-                max_t_all = max(s['tempo'] for s in all_solutions)
-                
-                range_c_all = max_c_all - min_c_all if max_c_all > min_c_all else 1
-                range_t_all = max_t_all - min_t_all if max_t_all > min_t_all else 1
-                
-                print(f"\nDEBUG: Ranges globais para seleção (alpha={alpha:.2f}):")
-                print(f"  Custo: R$ {min_c_all:.2f} - R$ {max_c_all:.2f}")
-                print(f"  Tempo: {min_t_all:.0f} - {max_t_all:.0f} min")
-                
-                # Calcular score baseado em alpha para TODAS as soluções
-                for sol in all_solutions:
-                    custo_norm = (sol['custo'] - min_c_all) / range_c_all
-                    tempo_norm = (sol['tempo'] - min_t_all) / range_t_all
-                    sol['_alpha_score'] = alpha * custo_norm + (1-alpha) * tempo_norm
-                
-                # Selecionar soluções baseado no alpha
-                # Pegar mais soluções para garantir diversidade
-                if alpha >= 0.7:
-                    # FOCO EM ECONOMIA: Ordenar por custo
-                    print(f"DEBUG: Modo ECONOMIA (alpha={alpha:.2f}) - Ordenando por CUSTO")
-                    balanced_solutions = sorted(all_solutions, key=lambda x: x['custo'])[:50]
-                
-                elif alpha <= 0.3:
-                    # FOCO EM VELOCIDADE: Ordenar por tempo
-                    print(f"DEBUG: Modo VELOCIDADE (alpha={alpha:.2f}) - Ordenando por TEMPO")
-                    balanced_solutions = sorted(all_solutions, key=lambda x: x['tempo'])[:50]
-                    
-                    # DEBUG: Mostrar as primeiras soluções
-                    print(f"DEBUG: 10 soluções mais RÁPIDAS disponíveis:")
-                    for i, sol in enumerate(balanced_solutions[:10]):
-                        pattern = tuple(row['tipo'] for _, row in sol['itinerario'].iterrows())
-                        print(f"  {i+1}. {str(pattern)[:40]:<40} - Custo: R$ {sol['custo']:>8,.2f} | Tempo: {sol['tempo']:>6.0f}min")
-                
+        self.metadados.contar('podados_duplicados', len(solutions) - len(unique_solutions))
+        
+        logger.debug("Soluções únicas após remover duplicatas exatas: %d", len(unique_solutions))
+        return unique_solutions
+    
+    def _log_padroes(self, solucoes):
+        """DEBUG: resumo de custo e tempo por padrão de tipos"""
+        from collections import defaultdict
+        solutions_by_pattern = defaultdict(list)
+        for sol in solucoes:
+            solutions_by_pattern[sol.padrao].append(sol)
+        
+        logger.debug("Padrões de tipo encontrados: %d", len(solutions_by_pattern))
+        for pattern, sols in sorted(solutions_by_pattern.items(), key=lambda x: min(s.custo for s in x[1])):
+            custos = [s.custo for s in sols]
+            tempos = [s.tempo for s in sols]
+            logger.debug(
+                "  %s: %d soluções | Custo: R$ %.2f - R$ %.2f | Tempo: %.0f - %.0f min",
+                pattern, len(sols), min(custos), max(custos), min(tempos), max(tempos)
+            )
+    
+    def _log_ordenacao(self, solucoes, alpha):
+        """DEBUG: primeiras e últimas soluções com a posição relativa no critério do alpha"""
+        min_c, max_c = min(s.custo for s in solucoes), max(s.custo for s in solucoes)
+        min_t, max_t = min(s.tempo for s in solucoes), max(s.tempo for s in solucoes)
+        
+        def pct(valor, minimo, maximo):
+            return (valor - minimo) / (maximo - minimo) * 100 if maximo > minimo else 0
+        
+        if alpha <= 0.3:
+            criterio = "TEMPO (mais rápido primeiro)"
+        elif alpha >= 0.7:
+            criterio = "CUSTO (mais barato primeiro)"
+        else:
+            criterio = "SCORE BALANCEADO"
+        
+        logger.debug(
+            "Verificação de ordenação (alpha=%.2f) por %s | custos R$ %.2f - R$ %.2f | tempos %.0f - %.0f min",
+            alpha, criterio, min_c, max_c, min_t, max_t
+        )
+        posicoes = list(enumerate(solucoes[:5], 1)) + list(enumerate(solucoes[-3:], len(solucoes) - 2))
+        for i, sol in posicoes:
+            logger.debug(
+                "  %d. %-30s R$ %10s (%5.1f%%) | %6.0f min (%5.1f%%)",
+                i, str(sol.padrao)[:30], f"{sol.custo:,.2f}", pct(sol.custo, min_c, max_c),
+                sol.tempo, pct(sol.tempo, min_t, max_t)
+            )
+    
+    def _log_tabela_final(self, solucoes):
+        """DEBUG: primeiras 20 soluções mostrando trade-off CUSTO vs TEMPO por padrão"""
+        # Melhor custo e melhor tempo de cada padrão, calculados uma única vez
+        melhores = {}
+        contagem = {}
+        for s in solucoes:
+            c, t = melhores.get(s.padrao, (np.inf, np.inf))
+            melhores[s.padrao] = (min(c, s.custo), min(t, s.tempo))
+            contagem[s.padrao] = contagem.get(s.padrao, 0) + 1
+        
+        logger.debug("%-4s %-30s %-15s %-12s %-15s", '#', 'Padrão', 'Custo', 'Tempo', 'Foco')
+        for i, sol in enumerate(solucoes[:20], 1):
+            if contagem[sol.padrao] > 1:
+                is_cheapest = sol.custo == melhores[sol.padrao][0]
+                is_fastest = sol.tempo == melhores[sol.padrao][1]
+                if is_cheapest and is_fastest:
+                    foco = "MELHOR GERAL"
+                elif is_cheapest:
+                    foco = "ECONOMIA"
+                elif is_fastest:
+                    foco = "RAPIDEZ"
                 else:
-                    # BALANCEADO: Ordenar por score alpha
-                    print(f"DEBUG: Modo BALANCEADO (alpha={alpha:.2f}) - Ordenando por SCORE")
-                    balanced_solutions = sorted(all_solutions, key=lambda x: x['_alpha_score'])[:50]
-                
-                print(f"DEBUG: Selecionadas {len(balanced_solutions)} soluções após aplicar alpha={alpha:.2f}")
+                    foco = "BALANCEADO"
             else:
-                balanced_solutions = []
-            
-            
-            # ORDENAÇÃO FINAL com alpha
-            # Só recalcular se ainda não tiver sido calculado
-            if balanced_solutions:
-                # Calcular ranges globais para normalização
-                all_custos = [s['custo'] for s in balanced_solutions]
-                all_tempos = [s['tempo'] for s in balanced_solutions]
-                
-                min_c_global = min(all_custos)
-                max_c_global = max(all_custos)
-                min_t_global = min(all_tempos)
-                max_t_global = max(all_tempos)
-                
-                range_c_global = max_c_global - min_c_global if max_c_global > min_c_global else 1
-                range_t_global = max_t_global - min_t_global if max_t_global > min_t_global else 1
-                
-                # A ordenação já foi feita acima baseada no alpha
-                # Não reordenar aqui
-                
-                alpha = self.config.get('alpha', 0.5)
-                print(f"\nDEBUG: Verificação de ordenação (alpha={alpha:.2f}):")
-                print(f"DEBUG: Range de custos: R$ {min_c_global:.2f} - R$ {max_c_global:.2f}")
-                print(f"DEBUG: Range de tempos: {min_t_global:.0f} - {max_t_global:.0f} min")
-                
-                if alpha <= 0.3:
-                    # Mostrar que está ordenado por TEMPO
-                    print(f"DEBUG: ORDENADO POR TEMPO (mais rápido primeiro):")
-                    print(f"DEBUG: Primeiras 5 soluções:")
-                    for i, sol in enumerate(balanced_solutions[:5]):
-                        tempo_pct = (sol['tempo']-min_t_global)/(max_t_global-min_t_global)*100 if max_t_global > min_t_global else 0
-                        pattern = tuple(row['tipo'] for _, row in sol['itinerario'].iterrows())
-                        print(f"  {i+1}. {str(pattern)[:30]:<30} Tempo: {sol['tempo']:>6.0f}min ({tempo_pct:5.1f}%) | Custo: R$ {sol['custo']:>8,.2f}")
-                    
-                    print(f"DEBUG: Últimas 3 soluções (mais lentas):")
-                    for i, sol in enumerate(balanced_solutions[-3:], len(balanced_solutions)-2):
-                        tempo_pct = (sol['tempo']-min_t_global)/(max_t_global-min_t_global)*100 if max_t_global > min_t_global else 0
-                        pattern = tuple(row['tipo'] for _, row in sol['itinerario'].iterrows())
-                        print(f"  {i}. {str(pattern)[:30]:<30} Tempo: {sol['tempo']:>6.0f}min ({tempo_pct:5.1f}%) | Custo: R$ {sol['custo']:>8,.2f}")
-                
-                elif alpha >= 0.7:
-                    # Mostrar que está ordenado por CUSTO
-                    print(f"DEBUG: ORDENADO POR CUSTO (mais barato primeiro):")
-                    print(f"DEBUG: Primeiras 5 soluções:")
-                    for i, sol in enumerate(balanced_solutions[:5]):
-                        custo_pct = (sol['custo']-min_c_global)/(max_c_global-min_c_global)*100 if max_c_global > min_c_global else 0
-                        pattern = tuple(row['tipo'] for _, row in sol['itinerario'].iterrows())
-                        print(f"  {i+1}. {str(pattern)[:30]:<30} Custo: R$ {sol['custo']:>8,.2f} ({custo_pct:5.1f}%) | Tempo: {sol['tempo']:>6.0f}min")
-                    
-                    print(f"DEBUG: Últimas 3 soluções (mais caras):")
-                    for i, sol in enumerate(balanced_solutions[-3:], len(balanced_solutions)-2):
-                        custo_pct = (sol['custo']-min_c_global)/(max_c_global-min_c_global)*100 if max_c_global > min_c_global else 0
-                        pattern = tuple(row['tipo'] for _, row in sol['itinerario'].iterrows())
-                        print(f"  {i}. {str(pattern)[:30]:<30} Custo: R$ {sol['custo']:>8,.2f} ({custo_pct:5.1f}%) | Tempo: {sol['tempo']:>6.0f}min")
-                
-                else:
-                    # BALANCEADO
-                    print(f"DEBUG: ORDENADO POR SCORE BALANCEADO:")
-                    print(f"DEBUG: Primeiras 5 soluções:")
-                    for i, sol in enumerate(balanced_solutions[:5]):
-                        custo_pct = (sol['custo']-min_c_global)/(max_c_global-min_c_global)*100 if max_c_global > min_c_global else 0
-                        tempo_pct = (sol['tempo']-min_t_global)/(max_t_global-min_t_global)*100 if max_t_global > min_t_global else 0
-                        pattern = tuple(row['tipo'] for _, row in sol['itinerario'].iterrows())
-                        print(f"  {i+1}. {str(pattern)[:30]:<30} R$ {sol['custo']:>8,.2f} ({custo_pct:5.1f}%) | {sol['tempo']:>6.0f}min ({tempo_pct:5.1f}%)")
-                    
-                    print(f"DEBUG: Últimas 3 soluções:")
-                    for i, sol in enumerate(balanced_solutions[-3:], len(balanced_solutions)-2):
-                        custo_pct = (sol['custo']-min_c_global)/(max_c_global-min_c_global)*100 if max_c_global > min_c_global else 0
-                        tempo_pct = (sol['tempo']-min_t_global)/(max_t_global-min_t_global)*100 if max_t_global > min_t_global else 0
-                        pattern = tuple(row['tipo'] for _, row in sol['itinerario'].iterrows())
-                        print(f"  {i}. {str(pattern)[:30]:<30} R$ {sol['custo']:>8,.2f} ({custo_pct:5.1f}%) | {sol['tempo']:>6.0f}min ({tempo_pct:5.1f}%)")
-            
-            final_solutions = balanced_solutions[:50] if balanced_solutions else None
-            print(f"DEBUG: Retornando {len(final_solutions) if final_solutions else 0} soluções")
-            
-            # Mostrar primeiras 20 para debug com CUSTO E TEMPO
-            if final_solutions:
-                print(f"\nDEBUG: Primeiras 20 soluções mostrando trade-off CUSTO vs TEMPO:")
-                print(f"{'#':<4} {'Padrão':<30} {'Custo':<15} {'Tempo':<12} {'Foco':<15}")
-                print("-"*80)
-                
-                alpha = self.config.get('alpha', 0.5)
-                for i, sol in enumerate(final_solutions[:20]):
-                    pattern = tuple(row['tipo'] for _, row in sol['itinerario'].iterrows())
-                    pattern_str = str(pattern)
-                    
-                    # Determinar foco baseado em posição relativa
-                    all_same_pattern = [s for s in final_solutions if tuple(row['tipo'] for _, row in s['itinerario'].iterrows()) == pattern]
-                    if len(all_same_pattern) > 1:
-                        custos_pattern = [s['custo'] for s in all_same_pattern]
-                        tempos_pattern = [s['tempo'] for s in all_same_pattern]
-                        
-                        is_cheapest = sol['custo'] == min(custos_pattern)
-                        is_fastest = sol['tempo'] == min(tempos_pattern)
-                        
-                        if is_cheapest and is_fastest:
-                            foco = "MELHOR GERAL"
-                        elif is_cheapest:
-                            foco = "ECONOMIA"
-                        elif is_fastest:
-                            foco = "RAPIDEZ"
-                        else:
-                            foco = "BALANCEADO"
-                    else:
-                        foco = "ÚNICA"
-                    
-                    print(f"{i+1:<4} {pattern_str:<30} R$ {sol['custo']:>10,.2f}  {sol['tempo']:>6} min  {foco:<15}")
-            
-            return final_solutions
+                foco = "ÚNICA"
+            logger.debug("%-4d %-30s R$ %10s  %6.0f min  %-15s", i, str(sol.padrao), f"{sol.custo:,.2f}", sol.tempo, foco)
+    
+    def _conexoes_disponiveis(self):
+        """Mapeia todas as conexões (origem, destino) disponíveis no banco"""
+        return self._segmentos.conexoes()
+    
+    def _find_viable_routes(self):
+        """Lista as rotas viáveis (circulares ou lineares) para cada ordem de destinos"""
+        origem = self.config['origem']
+        destinos = self.config['destinos']
         
-        return None
+        # NOVA ABORDAGEM: Construir rotas baseadas nas conexões disponíveis
+        # Não forçar rota circular se não houver dados
+        conexoes_disponiveis = self._conexoes_disponiveis()
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Conexões disponíveis no banco:")
+            for orig, dest in sorted(conexoes_disponiveis):
+                seg = self._segmentos.segmento(orig, dest)
+                voos = len(seg.do_modo('voo'))
+                logger.debug("  %s -> %s: %d voos, %d carros", orig, dest, voos, len(seg) - voos)
+        
+        # Busca em profundidade com poda: prefixos sem conexão ou com destinos inalcançáveis
+        # são descartados sem enumerar as permutações que começam por eles
+        viable_routes = rotas_viaveis(origem, destinos, conexoes_disponiveis)
+        if logger.isEnabledFor(logging.DEBUG):
+            for rota in viable_routes:
+                logger.debug("Rota %s viável: %s", 'circular' if rota[-1] == origem else 'linear', ' -> '.join(rota))
+        
+        return viable_routes
+    
+    def _segment_offer_ids(self, from_city, to_city):
+        """IDs globais das ofertas de um segmento: voos em [0, n_voos), carros em [n_voos, n_voos + n_carros)"""
+        return self._segmentos.segmento(from_city, to_city).ids
+    
+    def _offer_vectors(self):
+        """Vetores de custo e tempo indexados pelo ID global da oferta"""
+        custos = np.concatenate([
+            self.df_voos['preco_numerico'].to_numpy(dtype=float),
+            self.df_carros['preco_numerico'].to_numpy(dtype=float)
+        ])
+        tempos = np.concatenate([
+            self.df_voos['duracao_min'].to_numpy(dtype=float),
+            self.df_carros['duracao_min'].to_numpy(dtype=float)
+        ])
+        return custos, tempos
+    
+    def _oferta(self, oferta_id):
+        """Converte um ID global de oferta na opção de segmento (tipo, id, índice e linha de dados)"""
+        n_voos = len(self.df_voos)
+        if oferta_id < n_voos:
+            return {'tipo': 'voo', 'id': oferta_id, 'index': self.df_voos.index[oferta_id], 'data': self.df_voos.iloc[oferta_id]}
+        j = oferta_id - n_voos
+        return {'tipo': 'carro', 'id': oferta_id, 'index': self.df_carros.index[j], 'data': self.df_carros.iloc[j]}
     
     def _generate_alternative_routes(self):
         """Gera múltiplas rotas alternativas explorando TODAS as opções de cada segmento"""
-        origem = self.config['origem']
-        destinos = self.config['destinos']
         budget = self.config['budget']
         alpha = self.config.get('alpha', 0.5)
         solutions = []
         
-        print(f"\n{'='*80}")
-        print(f"🔧 OTIMIZADOR INICIADO - ALPHA = {alpha:.2f}")
-        print(f"   Alpha = 1.0 -> Foco ECONOMIA (custo)")
-        print(f"   Alpha = 0.0 -> Foco VELOCIDADE (tempo)")
-        print(f"   Budget máximo: R$ {budget:,.2f}")
-        print(f"{'='*80}\n")
+        logger.debug("Otimizador iniciado: alpha=%.2f (1.0 = economia, 0.0 = velocidade), budget máximo R$ %.2f", alpha, budget)
         
-        from itertools import permutations, product
-        
-        # NOVA ABORDAGEM: Construir rotas baseadas nas conexões disponíveis
-        # Não forçar rota circular se não houver dados
-        
-        # Primeiro, mapear todas as conexões disponíveis
-        conexoes_disponiveis = set()
-        for _, row in self.df_voos.iterrows():
-            conexoes_disponiveis.add((row['origem'], row['destino']))
-        for _, row in self.df_carros.iterrows():
-            conexoes_disponiveis.add((row['local_retirada'], row['local_entrega']))
-        
-        print(f"\nDEBUG: Conexões disponíveis no banco:")
-        for orig, dest in sorted(conexoes_disponiveis):
-            voos = len(self.df_voos[(self.df_voos['origem']==orig) & (self.df_voos['destino']==dest)])
-            carros = len(self.df_carros[(self.df_carros['local_retirada']==orig) & (self.df_carros['local_entrega']==dest)])
-            print(f"  {orig} -> {dest}: {voos} voos, {carros} carros")
-        
-        # Tentar construir rotas viáveis
-        viable_routes = []
-        
-        # Gerar todas as permutações de destinos
-        for dest_order in permutations(destinos):
-            # Tentar rota circular: origem -> dest1 -> dest2 -> ... -> origem
-            rota_circular = [origem] + list(dest_order) + [origem]
-            
-            # Verificar se TODOS os segmentos da rota circular existem
-            circular_viable = True
-            for i in range(len(rota_circular) - 1):
-                if (rota_circular[i], rota_circular[i+1]) not in conexoes_disponiveis:
-                    circular_viable = False
-                    break
-            
-            if circular_viable:
-                viable_routes.append(rota_circular)
-                print(f"\nDEBUG: Rota circular viável: {' -> '.join(rota_circular)}")
-            else:
-                # Se rota circular não é viável, tentar rota linear (sem retorno)
-                rota_linear = [origem] + list(dest_order)
-                
-                linear_viable = True
-                for i in range(len(rota_linear) - 1):
-                    if (rota_linear[i], rota_linear[i+1]) not in conexoes_disponiveis:
-                        linear_viable = False
-                        break
-                
-                if linear_viable:
-                    viable_routes.append(rota_linear)
-                    print(f"\nDEBUG: Rota linear viável: {' -> '.join(rota_linear)}")
+        viable_routes = self._find_viable_routes()
+        self.metadados.contar('rotas_viaveis', len(viable_routes))
         
         if not viable_routes:
-            print("\n⚠️  ERRO: Nenhuma rota viável encontrada com os dados disponíveis!")
-            print("Verifique se há dados para todos os segmentos necessários.")
+            logger.warning("Nenhuma rota viável encontrada com os dados disponíveis; verifique se há dados para todos os segmentos necessários")
             return []
         
         # Para cada rota viável, gerar soluções
+        depurar = logger.isEnabledFor(logging.DEBUG)
         for rota in viable_routes:
-            print(f"\nDEBUG: Processando rota: {' -> '.join(rota)}")
-            
-            # Para cada segmento da rota, encontrar opções de voo e carro
-            segments_options = []
-            
-            for i in range(len(rota) - 1):
-                from_city = rota[i]
-                to_city = rota[i + 1]
-                
-                # Buscar voos para este segmento
-                voos_seg = self.df_voos[
-                    (self.df_voos['origem'] == from_city) & 
-                    (self.df_voos['destino'] == to_city)
-                ].copy()
-                
-                # Buscar carros para este segmento
-                carros_seg = self.df_carros[
-                    (self.df_carros['local_retirada'] == from_city) & 
-                    (self.df_carros['local_entrega'] == to_city)
-                ].copy()
-                
-                # Combinar voos e carros em uma lista de opções
-                opcoes_seg = []
-                
-                for idx, voo in voos_seg.iterrows():
-                    opcoes_seg.append({
-                        'tipo': 'voo',
-                        'index': idx,
-                        'data': voo
-                    })
-                
-                for idx, carro in carros_seg.iterrows():
-                    opcoes_seg.append({
-                        'tipo': 'carro',
-                        'index': idx,
-                        'data': carro
-                    })
-                
-                # ORDENAR opções por ALPHA (prioridade do usuário)
-                # alpha = 1.0 -> priorizar custo (mais barato)
-                # alpha = 0.0 -> priorizar tempo (mais rápido)
-                alpha = self.config.get('alpha', 0.5)
-                
-                if opcoes_seg:
-                    # Normalizar valores para ordenação
-                    custos = [opt['data']['preco_numerico'] for opt in opcoes_seg]
-                    tempos = [opt['data']['duracao_min'] for opt in opcoes_seg]
-                    
-                    min_c = min(custos)
-                    max_c = max(custos)
-                    min_t = min(tempos)
-                    max_t = max(tempos)
-                    
-                    range_c = max_c - min_c if max_c > min_c else 1
-                    range_t = max_t - min_t if max_t > min_t else 1
-                    
-                    # Calcular score baseado em alpha
-                    for opt in opcoes_seg:
-                        custo_norm = (opt['data']['preco_numerico'] - min_c) / range_c
-                        tempo_norm = (opt['data']['duracao_min'] - min_t) / range_t
-                        opt['score'] = alpha * custo_norm + (1 - alpha) * tempo_norm
-                    
-                    # Ordenar por score (menor é melhor)
-                    opcoes_seg.sort(key=lambda x: x['score'])
-                    
-                    # DEBUG: Mostrar como as opções foram ordenadas
-                    print(f"    Segmento {from_city} -> {to_city} (alpha={alpha:.2f}):")
-                    print(f"      Total de {len(opcoes_seg)} opções ordenadas por score")
-                    if len(opcoes_seg) <= 5:
-                        for i, opt in enumerate(opcoes_seg[:5]):
-                            print(f"        {i+1}. {opt['tipo']:6} R$ {opt['data']['preco_numerico']:6.2f} | {opt['data']['duracao_min']:4.0f}min | score={opt['score']:.3f}")
-                
-                if not opcoes_seg:
-                    # Sem opções para este segmento (não deveria acontecer se rota é viável)
-                    segments_options = None
-                    break
-                
-                segments_options.append(opcoes_seg)
-            
-            # Se conseguimos opções para todos os segmentos
-            if segments_options:
-                print(f"DEBUG: Analisando rota {rota}")
-                for i, seg_opts in enumerate(segments_options):
-                    voos_count = sum(1 for opt in seg_opts if opt['tipo'] == 'voo')
-                    carros_count = sum(1 for opt in seg_opts if opt['tipo'] == 'carro')
-                    print(f"  Segmento {i} ({rota[i]} -> {rota[i+1]}): {voos_count} voos, {carros_count} carros")
-                
-                # ESTRATÉGIA: Garantir que CADA TIPO (voo/carro) de CADA SEGMENTO apareça
-                
-                # Criar templates de tipos (ex: [voo, voo, carro] ou [carro, voo, voo])
-                tipo_options_per_segment = []
-                for seg_opts in segments_options:
-                    tipos_disponiveis = set()
-                    if any(opt['tipo'] == 'voo' for opt in seg_opts):
-                        tipos_disponiveis.add('voo')
-                    if any(opt['tipo'] == 'carro' for opt in seg_opts):
-                        tipos_disponiveis.add('carro')
-                    tipo_options_per_segment.append(list(tipos_disponiveis))
-                
-                print(f"  Tipos disponíveis por segmento: {tipo_options_per_segment}")
-                
-                # Gerar todas as combinações de TIPOS
-                from math import prod
-                tipo_combos = list(product(*tipo_options_per_segment))
-                print(f"  Total de padrões de tipo: {len(tipo_combos)}")
-                
-                # Para cada padrão de tipo, pegar TODAS as opções específicas
-                for tipo_pattern in tipo_combos:
-                    print(f"    Gerando soluções para padrão: {tipo_pattern}")
-                    
-                    # Filtrar opções de cada segmento pelo tipo do padrão
-                    # E pegar apenas as TOP N opções segundo alpha (já estão ordenadas)
-                    filtered_segments = []
-                    max_options_per_segment = 10  # Limitar para evitar explosão combinatória
-                    
-                    for seg_idx, tipo_desejado in enumerate(tipo_pattern):
-                        opcoes_filtradas = [
-                            opt for opt in segments_options[seg_idx] 
-                            if opt['tipo'] == tipo_desejado
-                        ]
-                        # Pegar apenas as melhores opções (já ordenadas por alpha)
-                        opcoes_filtradas = opcoes_filtradas[:max_options_per_segment]
-                        filtered_segments.append(opcoes_filtradas)
-                    
-                    # Gerar TODAS as combinações para este padrão de tipo
-                    total_combos = prod(len(seg) for seg in filtered_segments)
-                    print(f"      Combinações possíveis: {total_combos}")
-                    
-                    # Limitar apenas se houver muitas combinações
-                    if total_combos <= 100:
-                        # Gerar todas
-                        for combo in product(*filtered_segments):
-                            solutions.extend(self._create_solution_from_combo(combo, budget))
-                    else:
-                        # Gerar uma amostra: mais baratas, mais caras, e algumas do meio
-                        all_combos = list(product(*filtered_segments))
-                        
-                        # Ordenar por custo
-                        all_combos_with_cost = []
-                        for combo in all_combos:
-                            custo = sum(seg['data']['preco_numerico'] for seg in combo)
-                            all_combos_with_cost.append((custo, combo))
-                        all_combos_with_cost.sort(key=lambda x: x[0])  # Ordenar apenas por custo
-                        
-                        # Pegar 20 mais baratas, 10 mais caras, e 20 do meio
-                        samples = []
-                        samples.extend(all_combos_with_cost[:20])  # 20 mais baratas
-                        if len(all_combos_with_cost) > 40:
-                            meio = len(all_combos_with_cost) // 2
-                            samples.extend(all_combos_with_cost[meio-10:meio+10])  # 20 do meio
-                            samples.extend(all_combos_with_cost[-10:])  # 10 mais caras
-                        
-                        for custo, combo in samples:
-                            solutions.extend(self._create_solution_from_combo(combo, budget))
-                        
-                        print(f"      Gerando amostra de {len(samples)} combinações")
-                
-                print(f"  Total de soluções geradas para esta rota: {len(solutions)}")
+            if depurar:
+                logger.debug("Processando rota: %s", ' -> '.join(rota))
+            solutions.extend(self._candidatos(
+                amostrar_rota(rota, self._segmentos, self._custos, self._tempos, self.config)))
+            logger.debug("  Total de soluções geradas até esta rota: %d", len(solutions))
         
-        print(f"\nDEBUG: Total de soluções geradas: {len(solutions)}")
+        logger.debug("Total de soluções geradas: %d", len(solutions))
         return solutions
     
-    def _create_solution_from_combo(self, combo, budget):
-        """Cria solução a partir de uma combinação de segmentos"""
-        # Calcular custo e tempo total
-        custo_total = sum(seg['data']['preco_numerico'] for seg in combo)
-        tempo_total = sum(seg['data']['duracao_min'] for seg in combo)
+    def _generate_exact_routes(self):
+        """Modo exato: fronteira de Pareto completa de cada rota viável, por padrão de tipos"""
+        solutions = []
+        
+        viable_routes = self._find_viable_routes()
+        self.metadados.contar('rotas_viaveis', len(viable_routes))
+        if not viable_routes:
+            logger.warning("Nenhuma rota viável encontrada com os dados disponíveis")
+            return []
         
-        # Verificar orçamento (permitir até 20% acima para mais opções)
-        if custo_total > budget * 1.2:
+        for rota in viable_routes:
+            solutions.extend(self._candidatos(
+                fronteira_exata(rota, self._segmentos, self._custos, self._tempos, self.config)))
+        
+        logger.debug("Total de soluções geradas (modo exato): %d", len(solutions))
+        return solutions
+    
+    def _generate_subset_routes(self):
+        """Fronteira sobre todas as ordens de destinos via DP por subconjuntos (Held-Karp)"""
+        solutions = self._candidatos(fronteira_subconjuntos(
+            self.config['origem'], self._segmentos, self._custos, self._tempos, self.config))
+        if not solutions:
+            logger.warning("Nenhuma rota viável encontrada com os dados disponíveis")
             return []
         
-        # Construir itinerário
+        logger.debug("Total de soluções geradas (DP por subconjuntos): %d", len(solutions))
+        return solutions
+    
+    def _tarefas_origem(self, origem):
+        """Tarefas independentes de geração de uma origem: uma por rota viável, ou a DP inteira"""
+        if self._muitos_destinos():
+            return [('subconjuntos', origem, None)]
+        
+        modo = 'exato' if self.config.get('route_mode', 'amostragem') == 'exato' else 'amostragem'
+        rotas = rotas_viaveis(origem, self.config['destinos'], self._conexoes_disponiveis())
+        return [(modo, origem, rota) for rota in rotas]
+    
+    def _gerar_em_paralelo(self, origens, workers):
+        """Distribui rotas (e origens) entre processos e junta os resultados compactos por origem"""
+        tarefas = [tarefa for origem in origens for tarefa in self._tarefas_origem(origem)]
+        por_origem = {origem: [] for origem in origens}
+        self.metadados.contar('rotas_viaveis', sum(rota is not None for _, _, rota in tarefas))
+        
+        with self.metadados.fase('geracao'):
+            if tarefas:
+                with ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=iniciar_worker,
+                    initargs=(self._segmentos, self._custos, self._tempos, self.config)
+                ) as pool:
+                    # map preserva a ordem das tarefas, então o resultado é o mesmo da execução serial
+                    lote = max(1, len(tarefas) // (workers * 4))
+                    for origem, resultados in pool.map(executar_tarefa, tarefas, chunksize=lote):
+                        por_origem[origem].extend(self._candidatos(resultados))
+        self.metadados.contar('candidatos_gerados', sum(len(c) for c in por_origem.values()))
+        
+        solutions = []
+        for origem in origens:
+            candidatos = por_origem[origem]
+            # Mesmo fallback de _gerar_candidatos, executado no processo principal
+            if len(candidatos) < 2 and not self._muitos_destinos():
+                self.config['origem'] = origem
+                candidatos.extend(self._solve_with_nsga2())
+            solutions.extend(candidatos)
+        
+        logger.debug("Total de soluções geradas em %d processos: %d", workers, len(solutions))
+        return solutions
+    
+    def _candidatos(self, resultados):
+        """Converte resultados compactos (IDs, custo, tempo) em candidatos"""
+        return [
+            Candidato(ofertas, custo, tempo, tuple('Voo' if i < self._n_voos else 'Carro' for i in ofertas))
+            for ofertas, custo, tempo in resultados
+        ]
+    
+    def _create_candidate(self, ofertas, budget):
+        """Cria candidato compacto a partir dos IDs globais das ofertas de cada segmento"""
+        avaliar_combo = avaliador(self._segmentos, self._custos, self._tempos, dict(self.config, budget=budget))
+        resultado = avaliar_combo(ofertas)
+        return self._candidatos([resultado]) if resultado is not None else []
+    
+    def _materializar(self, candidato):
+        """Monta o DataFrame do itinerário de um candidato (apenas para as soluções retornadas)"""
         itinerario_rows = []
         
-        for seg in combo:
+        for oferta_id in candidato.ofertas:
+            seg = self._oferta(oferta_id)
+            row = seg['data'].copy()
             if seg['tipo'] == 'voo':
-                row = seg['data'].copy()
                 row['tipo'] = 'Voo'
-                itinerario_rows.append(row)
             else:
-                row = seg['data'].copy()
                 row['tipo'] = 'Carro'
                 row['origem'] = row['local_retirada']
                 row['destino'] = row['local_entrega']
                 row['companhia'] = row['locadora']
                 row['data_ida'] = row.get('data_inicio', '')
-                itinerario_rows.append(row)
+            itinerario_rows.append(row)
         
-        if itinerario_rows:
-            itinerario = pd.DataFrame(itinerario_rows)
-            return [{
-                'itinerario': itinerario,
-                'custo': custo_total,
-                'tempo': tempo_total
-            }]
+        if self.config.get('horarios'):
+            # Partida efetiva de cada trecho e espera antes dela (já somada no tempo)
+            conexao, espera_max = parametros(self.config)
+            chegada = -np.inf
+            for row, oferta_id in zip(itinerario_rows, candidato.ofertas):
+                partida, espera, chegada, _ = propagar(self._segmentos.horarios, chegada, oferta_id, conexao, espera_max)
+                row['partida'] = pd.Timestamp(0) + pd.Timedelta(minutes=float(partida)) if np.isfinite(partida) else pd.NaT
+                row['espera_min'] = float(espera)
         
-        return []
+        return {
+            'itinerario': pd.DataFrame(itinerario_rows),
+            'custo': candidato.custo,
+            'tempo': candidato.tempo
+        }
     
     def _solve_with_nsga2(self):
         """Fallback: resolver com NSGA-II se geração manual falhar"""
+        with self.metadados.fase('nsga2'):
+            if self.config.get('nsga2_encoding', 'segmento') == 'binario':
+                solutions = self._solve_with_nsga2_binario()
+            else:
+                solutions = self._solve_with_nsga2_segmentos()
+        self.metadados.contar('candidatos_nsga2', len(solutions))
+        return solutions
+    
+    def _solve_with_nsga2_segmentos(self):
+        """NSGA-II com codificação por segmento (um gene por trecho da rota)"""
+        try:
+            viable_routes = self._find_viable_routes()
+            if not viable_routes:
+                return []
+            
+            # Ofertas de cada segmento de cada rota viável (IDs globais: voos e depois carros)
+            rotas_ofertas = [
+                [self._segment_offer_ids(rota[i], rota[i + 1]) for i in range(len(rota) - 1)]
+                for rota in viable_routes
+            ]
+            problem = SegmentTripProblem(rotas_ofertas, self._custos, self._tempos, self.config['budget'], self._horarios_nsga2())
+            
+            algorithm = NSGA2(
+                pop_size=200,
+                sampling=self._amostragem_inicial(rotas_ofertas, 200) or SegmentSampling(),
+                crossover=SegmentCrossover(),
+                mutation=SegmentMutation(),
+                eliminate_duplicates=True
+            )
+            
+            res = minimize(
+                problem,
+                algorithm,
+                self._terminacao_nsga2(self._geracoes_nsga2()),
+                seed=self.config.get('seed'),
+                verbose=False,
+                save_history=False
+            )
+            
+            logger.debug("NSGA-II encerrado após %d gerações (%.2fs)", res.algorithm.n_gen, res.exec_time)
+            self.metadados.contar('geracoes_nsga2', res.algorithm.n_gen)
+            
+            pop = res.pop
+            if pop is None or len(pop) == 0:
+                return []
+            
+            # Pareto Front (rank 0) da população final; todo indivíduo já é um itinerário válido
+            F = pop.get("F")
+            X = pop.get("X")
+            pareto_indices = NonDominatedSorting().do(F, only_non_dominated_front=True)
+            
+            solutions = []
+            vistos = set()
+            for idx in pareto_indices[np.argsort(F[pareto_indices, 0])]:
+                ids = tuple(problem.decode(X[idx]))
+                if ids in vistos:
+                    continue
+                vistos.add(ids)
+                solutions.extend(self._create_candidate(ids, self.config['budget']))
+            
+            return solutions
+        except Exception:
+            logger.exception("Erro no NSGA-II")
+            return []
+    
+    def _horarios_nsga2(self):
+        """(grade, conexão mínima, espera máxima) quando config['horarios'] está ativo"""
+        if not self.config.get('horarios'):
+            return None
+        return (self._segmentos.horarios, *parametros(self.config))
+    
+    def _amostragem_inicial(self, rotas_ofertas, n):
+        """População inicial semeada pelas combinações k-best de cada rota (None quando desligada)"""
+        if not self.config.get('nsga2_warm_start', True) or not rotas_ofertas:
+            return None
+        sementes = sementes_kbest(rotas_ofertas, self._custos, self._tempos, self.config.get('alpha', 0.5), n=n)
+        return SegmentWarmSampling(sementes)
+    
+    def _geracoes_nsga2(self):
+        """Gerações do NSGA-II: com a população semeada a convergência exige bem menos"""
+        padrao = 50 if self.config.get('nsga2_warm_start', True) else 200
+        return self.config.get('nsga2_geracoes', padrao)
+    
+    def _terminacao_nsga2(self, max_geracoes):
+        """Para no máximo de gerações, na estagnação do hipervolume ou no limite de tempo"""
+        criterios = [MaximumGenerationTermination(max_geracoes)]
+        periodo = self.config.get('nsga2_periodo', 10)
+        if periodo:
+            criterios.append(EstagnacaoHipervolume(periodo, self.config.get('nsga2_tol', 1e-3)))
+        tempo_max = self.config.get('nsga2_tempo_max', 30)
+        if tempo_max:
+            criterios.append(TimeBasedTermination(tempo_max))
+        return TerminationCollection(*criterios)
+    
+    def _solve_with_nsga2_binario(self):
+        """Codificação binária original (um bit por voo e por carro), mantida para comparação"""
         try:
             # Criar problema de otimização
             problem = TripOptimizationProblem(self.df_voos, self.df_carros, self.config)
             
             # Configurar NSGA-II com parâmetros para maior diversidade
+            # A semeadura não é usada aqui: a evolução volta a seleções inválidas de qualquer forma
             algorithm = NSGA2(
                 pop_size=200,  # População maior para mais diversidade
                 sampling=BinaryRandomSampling(),
@@ -813,17 +1170,18 @@ class TripOptimizerEngine:
             )
             
             # Critério de parada - mais gerações para convergência
-            termination = get_termination("n_gen", 200)
+            termination = self._terminacao_nsga2(self.config.get('nsga2_geracoes', 200))
             
             # Executar otimização
             res = minimize(
                 problem,
                 algorithm,
                 termination,
-                seed=None,  # Sem seed fixo para mais diversidade
+                seed=self.config.get('seed'),  # Sem seed fixo (padrão) para mais diversidade
                 verbose=False,
                 save_history=False
             )
+            self.metadados.contar('geracoes_nsga2', res.algorithm.n_gen)
             
             solutions = []
             
@@ -842,130 +1200,57 @@ class TripOptimizerEngine:
                 # Pegar apenas a primeira frente (Pareto Front)
                 pareto_indices = fronts[0]
                 
-                # Se há múltiplas soluções no Pareto Front
-                if len(pareto_indices) > 1:
-                    pareto_solutions = X[pareto_indices]
-                    pareto_objectives = F[pareto_indices]
-                    
-                    # Ordenar soluções por custo (primeiro objetivo)
-                    sorted_indices = np.argsort(pareto_objectives[:, 0])
-                    pareto_solutions = pareto_solutions[sorted_indices]
-                    pareto_objectives = pareto_objectives[sorted_indices]
-                    
-                    # Limitar a no máximo 10 soluções mais diversas
-                    n_solutions = min(10, len(pareto_solutions))
-                    
-                    # Selecionar soluções espaçadas ao longo do Pareto Front
-                    if n_solutions > 1:
-                        indices = np.linspace(0, len(pareto_solutions) - 1, n_solutions, dtype=int)
-                    else:
-                        indices = [0]
-                    
-                    for idx in indices:
-                        solution = pareto_solutions[idx]
-                        objectives = pareto_objectives[idx]
-                        
-                        # Decodificar solução
-                        n_voos = len(self.df_voos)
-                        voos_sel = solution[:n_voos]
-                        carros_sel = solution[n_voos:]
-                        
-                        # Criar itinerário
-                        v_res = self.df_voos.loc[[i for i, sel in enumerate(voos_sel) if sel]].copy()
-                        v_res['tipo'] = 'Voo'
-                        
-                        c_res = self.df_carros.loc[[j for j, sel in enumerate(carros_sel) if sel]].copy()
-                        c_res['tipo'] = 'Carro'
-                        c_res = c_res.rename(columns={
-                            'local_retirada': 'origem',
-                            'local_entrega': 'destino',
-                            'locadora': 'companhia',
-                            'data_inicio': 'data_ida'
-                        })
-                        
-                        if not v_res.empty or not c_res.empty:
-                            itinerario = pd.concat([v_res, c_res], ignore_index=True)
-                            itinerario_ordenado = self.ordenar_itinerario(itinerario)
-                            
-                            # Validar se o itinerário é válido antes de adicionar
-                            if self._validate_itinerary(itinerario_ordenado):
-                                solutions.append({
-                                    'itinerario': itinerario_ordenado,
-                                    'custo': objectives[0],
-                                    'tempo': objectives[1]
-                                })
-                else:
-                    # Apenas uma solução no Pareto Front
-                    pareto_idx = pareto_indices[0]
-                    solution = X[pareto_idx]
-                    objectives = F[pareto_idx]
-                    
-                    n_voos = len(self.df_voos)
-                    voos_sel = solution[:n_voos]
-                    carros_sel = solution[n_voos:]
-                    
-                    v_res = self.df_voos.loc[[i for i, sel in enumerate(voos_sel) if sel]].copy()
-                    v_res['tipo'] = 'Voo'
-                    
-                    c_res = self.df_carros.loc[[j for j, sel in enumerate(carros_sel) if sel]].copy()
-                    c_res['tipo'] = 'Carro'
-                    c_res = c_res.rename(columns={
-                        'local_retirada': 'origem',
-                        'local_entrega': 'destino',
-                        'locadora': 'companhia',
-                        'data_inicio': 'data_ida'
-                    })
-                    
-                    if not v_res.empty or not c_res.empty:
-                        itinerario = pd.concat([v_res, c_res], ignore_index=True)
-                        itinerario_ordenado = self.ordenar_itinerario(itinerario)
-                        
-                        # Validar se o itinerário é válido antes de adicionar
-                        if self._validate_itinerary(itinerario_ordenado):
-                            solutions.append({
-                                'itinerario': itinerario_ordenado,
-                                'custo': objectives[0],
-                                'tempo': objectives[1]
-                            })
-            else:
-                # Fallback: Se não conseguimos pegar da população, usar res.X e res.F
-                if hasattr(res, 'F') and res.F is not None:
-                    solution = res.X if len(res.X.shape) == 1 else res.X[0]
-                    objectives = res.F if len(res.F.shape) == 1 else res.F[0]
-                    
-                    n_voos = len(self.df_voos)
-                    voos_sel = solution[:n_voos]
-                    carros_sel = solution[n_voos:]
-                    
-                    v_res = self.df_voos.loc[[i for i, sel in enumerate(voos_sel) if sel]].copy()
-                    v_res['tipo'] = 'Voo'
-                    
-                    c_res = self.df_carros.loc[[j for j, sel in enumerate(carros_sel) if sel]].copy()
-                    c_res['tipo'] = 'Carro'
-                    c_res = c_res.rename(columns={
-                        'local_retirada': 'origem',
-                        'local_entrega': 'destino',
-                        'locadora': 'companhia',
-                        'data_inicio': 'data_ida'
-                    })
-                    
-                    if not v_res.empty or not c_res.empty:
-                        itinerario = pd.concat([v_res, c_res], ignore_index=True)
-                        itinerario_ordenado = self.ordenar_itinerario(itinerario)
-                        
-                        # Validar se o itinerário é válido antes de adicionar
-                        if self._validate_itinerary(itinerario_ordenado):
-                            solutions.append({
-                                'itinerario': itinerario_ordenado,
-                                'custo': objectives[0],
-                                'tempo': objectives[1]
-                            })
+                # Ordenar soluções por custo (primeiro objetivo)
+                pareto_solutions = X[pareto_indices][np.argsort(F[pareto_indices, 0])]
+                
+                # Limitar a no máximo 10 soluções espaçadas ao longo do Pareto Front
+                n_solutions = min(10, len(pareto_solutions))
+                indices = np.linspace(0, len(pareto_solutions) - 1, n_solutions, dtype=int) if n_solutions > 1 else [0]
+                
+                for idx in indices:
+                    solutions.extend(self._candidate_from_bits(pareto_solutions[idx]))
+            elif hasattr(res, 'F') and res.F is not None:
+                # Fallback: Se não conseguimos pegar da população, usar res.X
+                solution = res.X if len(res.X.shape) == 1 else res.X[0]
+                solutions.extend(self._candidate_from_bits(solution))
             
             return solutions
-        except Exception as e:
-            print(f"Erro no NSGA-II: {e}")
+        except Exception:
+            logger.exception("Erro no NSGA-II")
             return []
-
+    
+    def _candidate_from_bits(self, solution):
+        """Decodifica um indivíduo binário; retorna candidato só se formar um itinerário válido"""
+        n_voos = len(self.df_voos)
+        voos_sel = solution[:n_voos]
+        carros_sel = solution[n_voos:]
+        
+        # Criar itinerário, guardando o ID global de cada oferta para montar o candidato
+        v_res = self.df_voos.iloc[[i for i, sel in enumerate(voos_sel) if sel]].copy()
+        v_res['tipo'] = 'Voo'
+        v_res['_oferta_id'] = [i for i, sel in enumerate(voos_sel) if sel]
+        
+        c_res = self.df_carros.iloc[[j for j, sel in enumerate(carros_sel) if sel]].copy()
+        c_res['tipo'] = 'Carro'
+        c_res['_oferta_id'] = [n_voos + j for j, sel in enumerate(carros_sel) if sel]
+        c_res = c_res.rename(columns={
+            'local_retirada': 'origem',
+            'local_entrega': 'destino',
+            'locadora': 'companhia',
+            'data_inicio': 'data_ida'
+        })
+        
+        if v_res.empty and c_res.empty:
+            return []
+        
+        itinerario = pd.concat([v_res, c_res], ignore_index=True)
+        itinerario_ordenado = self.ordenar_itinerario(itinerario)
+        
+        # Validar se o itinerário é válido antes de adicionar
+        if not self._validate_itinerary(itinerario_ordenado):
+            return []
+        return self._create_candidate(itinerario_ordenado['_oferta_id'].tolist(), self.config['budget'])
+    
     def ordenar_itinerario(self, df):
         ordenado, atual, pool = [], self.config['origem'], df.copy()
         while not pool.empty:
@@ -0,0 +1,264 @@
+import logging
+from itertools import chain, product
+from math import prod
+
+import numpy as np
+
+from backend.horarios import espera_itinerario, fronteira_rota_horarios, parametros
+from backend.kbest import k_melhores
+from backend.pareto import fronteira_rota
+from backend.routing import fronteira_destinos
+
+logger = logging.getLogger(__name__)
+
+
+def avaliar(ofertas, custos, tempos, budget):
+    """(IDs, custo, tempo) de um itinerário, ou None se passar da folga de 20% sobre o orçamento"""
+    ofertas = tuple(int(i) for i in ofertas)
+    if not ofertas:
+        return None
+
+    # Calcular custo e tempo total
+    custo_total = sum(custos[list(ofertas)].tolist())
+    tempo_total = sum(tempos[list(ofertas)].tolist())
+
+    # Verificar orçamento (permitir até 20% acima para mais opções)
+    if custo_total > budget * 1.2:
+        return None
+    return ofertas, custo_total, tempo_total
+
+
+def avaliar_horarios(ofertas, grade, custos, tempos, budget, conexao, espera_max=None):
+    """Como avaliar, exigindo conexões viáveis nos horários e somando as esperas ao tempo"""
+    resultado = avaliar(ofertas, custos, tempos, budget)
+    if resultado is None:
+        return None
+    ofertas, custo_total, tempo_total = resultado
+    espera = espera_itinerario(grade, ofertas, conexao, espera_max)
+    if espera is None:
+        return None
+    return ofertas, custo_total, tempo_total + espera
+
+
+def avaliador(indice, custos, tempos, config):
+    """Função IDs -> (IDs, custo, tempo) ou None; com config['horarios'] considera as conexões"""
+    budget = config['budget']
+    if config.get('horarios'):
+        conexao, espera_max = parametros(config)
+        return lambda ofertas: avaliar_horarios(ofertas, indice.horarios, custos, tempos, budget, conexao, espera_max)
+    return lambda ofertas: avaliar(ofertas, custos, tempos, budget)
+
+
+def amostrar_rota(rota, indice, custos, tempos, config):
+    """Modo amostragem: combinações de uma rota por padrão de tipos, priorizadas pelo alpha.
+
+    Returns:
+        lista de (IDs, custo, tempo) dentro da folga do orçamento
+    """
+    alpha = config.get('alpha', 0.5)
+    avaliar_combo = avaliador(indice, custos, tempos, config)
+    resultados = []
+
+    # Para cada segmento da rota, as ofertas vêm do índice já ordenadas por score
+    segments_options = []
+
+    for i in range(len(rota) - 1):
+        from_city = rota[i]
+        to_city = rota[i + 1]
+        seg = indice.segmento(from_city, to_city)
+
+        if len(seg) == 0:
+            # Sem opções para este segmento (não deveria acontecer se rota é viável)
+            return []
+
+        # ORDENAR opções por ALPHA (prioridade do usuário)
+        # alpha = 1.0 -> priorizar custo (mais barato)
+        # alpha = 0.0 -> priorizar tempo (mais rápido)
+        range_c = np.ptp(seg.custos) or 1
+        range_t = np.ptp(seg.tempos) or 1
+        score = (
+            alpha * (seg.custos - seg.custos.min()) / range_c
+            + (1 - alpha) * (seg.tempos - seg.tempos.min()) / range_t
+        )
+        ordem = np.argsort(score, kind='stable')  # Ordenar por score (menor é melhor)
+
+        # DEBUG: Mostrar como as opções foram ordenadas
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Segmento %s -> %s (alpha=%.2f): %d opções ordenadas por score",
+                         from_city, to_city, alpha, len(seg))
+            if len(seg) <= 5:
+                for pos, j in enumerate(ordem):
+                    logger.debug("  %d. %-6s R$ %6.2f | %4.0fmin | score=%.3f", pos + 1, seg.modos[j],
+                                 seg.custos[j], seg.tempos[j], score[j])
+
+        segments_options.append((seg.ids[ordem], seg.modos[ordem], score[ordem]))
+
+    if not segments_options:
+        return []
+
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, (ids, modos, _) in enumerate(segments_options):
+            voos_count = int((modos == 'voo').sum())
+            logger.debug("  Segmento %d (%s -> %s): %d voos, %d carros",
+                         i, rota[i], rota[i+1], voos_count, len(ids) - voos_count)
+
+    # ESTRATÉGIA: Garantir que CADA TIPO (voo/carro) de CADA SEGMENTO apareça
+
+    # Criar templates de tipos (ex: [voo, voo, carro] ou [carro, voo, voo])
+    tipo_options_per_segment = [
+        [t for t in ('voo', 'carro') if (modos == t).any()]
+        for _, modos, _ in segments_options
+    ]
+
+    logger.debug("  Tipos disponíveis por segmento: %s", tipo_options_per_segment)
+
+    # Gerar todas as combinações de TIPOS
+    tipo_combos = list(product(*tipo_options_per_segment))
+    logger.debug("  Total de padrões de tipo: %d", len(tipo_combos))
+
+    def adicionar(combo):
+        resultado = avaliar_combo(combo)
+        if resultado is not None:
+            resultados.append(resultado)
+
+    # Para cada padrão de tipo, pegar TODAS as opções específicas
+    for tipo_pattern in tipo_combos:
+        logger.debug("    Gerando soluções para padrão: %s", tipo_pattern)
+
+        # Filtrar opções de cada segmento pelo tipo do padrão
+        # E pegar apenas as TOP N opções segundo alpha (já estão ordenadas)
+        filtered_segments = []
+        filtered_scores = []
+        max_options_per_segment = config.get('max_opcoes_segmento', 30)
+
+        for seg_idx, tipo_desejado in enumerate(tipo_pattern):
+            ids, modos, scores = segments_options[seg_idx]
+            do_tipo = modos == tipo_desejado
+            # Pegar apenas as melhores opções (já ordenadas por alpha)
+            filtered_segments.append(ids[do_tipo][:max_options_per_segment].tolist())
+            filtered_scores.append(scores[do_tipo][:max_options_per_segment].tolist())
+
+        total_combos = prod(len(seg) for seg in filtered_segments)
+        logger.debug("      Combinações possíveis: %d", total_combos)
+
+        # Limitar apenas se houver muitas combinações
+        if total_combos <= 100:
+            # Gerar todas
+            for combo in product(*filtered_segments):
+                adicionar(combo)
+        else:
+            # Amostra enumerada em ordem pela fila de prioridade, sem montar o produto:
+            # 20 mais baratas, 20 melhores pelo score do alpha e 10 mais caras
+            custos_oferta = custos.tolist()
+            custos_seg = [[custos_oferta[i] for i in seg] for seg in filtered_segments]
+            amostras = [
+                k_melhores(custos_seg, 20),
+                k_melhores(filtered_scores, 20),
+                k_melhores([[-c for c in seg] for seg in custos_seg], 10),
+            ]
+
+            vistos = set()
+            for _, indices in chain(*amostras):
+                if indices in vistos:
+                    continue
+                vistos.add(indices)
+                adicionar([seg[i] for seg, i in zip(filtered_segments, indices)])
+
+            logger.debug("      Gerando amostra de %d combinações", len(vistos))
+
+    return resultados
+
+
+def fronteira_exata(rota, indice, custos, tempos, config):
+    """Modo exato: fronteira de Pareto completa de uma rota, por padrão de tipos"""
+    budget = config['budget']
+    segmentos = [indice.segmento(rota[i], rota[i + 1]) for i in range(len(rota) - 1)]
+    if any(len(seg) == 0 for seg in segmentos):
+        return []
+    if config.get('horarios'):
+        return _fronteira_exata_horarios(rota, segmentos, indice.horarios, custos, tempos, config)
+
+    # Separar as ofertas de cada segmento por tipo para manter a diversidade de padrões
+    por_tipo = [{'voo': seg.do_modo('voo'), 'carro': seg.do_modo('carro')} for seg in segmentos]
+    tipos_por_segmento = [[t for t in ('voo', 'carro') if len(seg[t])] for seg in por_tipo]
+
+    resultados = []
+    for tipo_pattern in product(*tipos_por_segmento):
+        ids, _, _ = fronteira_rota(
+            [por_tipo[k][tipo] for k, tipo in enumerate(tipo_pattern)],
+            custos, tempos,
+            custo_max=budget * 1.2  # Mesma folga de orçamento de avaliar
+        )
+        for linha in ids:
+            resultado = avaliar(linha, custos, tempos, budget)
+            if resultado is not None:
+                resultados.append(resultado)
+        logger.debug("    Padrão %s: %d soluções na fronteira exata", tipo_pattern, len(ids))
+    return resultados
+
+
+def _fronteira_exata_horarios(rota, segmentos, grade, custos, tempos, config):
+    """fronteira_exata com horários: rótulos (custo, tempo, chegada) e só conexões viáveis"""
+    conexao, espera_max = parametros(config)
+    tipos_por_segmento = [[t for t in ('voo', 'carro') if (seg.modos == t).any()] for seg in segmentos]
+
+    resultados = []
+    for tipo_pattern in product(*tipos_por_segmento):
+        ids, f_custos, f_tempos = fronteira_rota_horarios(
+            [grade.segmento(rota[k], rota[k + 1], tipo) for k, tipo in enumerate(tipo_pattern)],
+            grade, custos, tempos, conexao, espera_max,
+            custo_max=config['budget'] * 1.2  # Mesma folga de orçamento de avaliar
+        )
+        resultados.extend(
+            (tuple(int(i) for i in linha), float(c), float(t)) for linha, c, t in zip(ids, f_custos, f_tempos)
+        )
+        logger.debug("    Padrão %s: %d soluções viáveis nos horários", tipo_pattern, len(ids))
+    return resultados
+
+
+def fronteira_subconjuntos(origem, indice, custos, tempos, config):
+    """Fronteira sobre todas as ordens de destinos via DP por subconjuntos (Held-Karp)"""
+    budget = config['budget']
+    horarios = {}
+    if config.get('horarios'):
+        conexao, espera_max = parametros(config)
+        horarios = {'grade': indice.horarios, 'conexao': conexao, 'espera_max': espera_max}
+    ofertas, f_custos, f_tempos = fronteira_destinos(
+        origem, config['destinos'], indice, custos, tempos,
+        custo_max=budget * 1.2,  # Mesma folga de orçamento de avaliar
+        **horarios
+    )
+    if horarios:
+        # O tempo dos rótulos já inclui as esperas, que avaliar não conhece
+        return [(tuple(int(i) for i in linha), float(c), float(t)) for linha, c, t in zip(ofertas, f_custos, f_tempos)]
+
+    resultados = []
+    for linha in ofertas:
+        resultado = avaliar(linha, custos, tempos, budget)
+        if resultado is not None:
+            resultados.append(resultado)
+    return resultados
+
+
+# Execução em processos: cada worker recebe o índice e os vetores uma única vez, na
+# inicialização, e as tarefas trafegam só como (tipo, origem, rota) -> [(IDs, custo, tempo)]
+_contexto = {}
+
+
+def iniciar_worker(indice, custos, tempos, config):
+    _contexto.update(indice=indice, custos=custos, tempos=tempos, config=config)
+
+
+def executar_tarefa(tarefa):
+    return executar(tarefa, _contexto['indice'], _contexto['custos'], _contexto['tempos'], _contexto['config'])
+
+
+def executar(tarefa, indice, custos, tempos, config):
+    """Executa uma tarefa (tipo, origem, rota); retorna (origem, [(IDs, custo, tempo)])"""
+    tipo, origem, rota = tarefa
+    args = (indice, custos, tempos, config)
+    if tipo == 'subconjuntos':
+        return origem, fronteira_subconjuntos(origem, *args)
+    if tipo == 'exato':
+        return origem, fronteira_exata(rota, *args)
+    return origem, amostrar_rota(rota, *args)
@@ -0,0 +1,37 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+RAIO_TERRA_KM = 6371
+
+# CSV de aeroportos relativo à raiz do projeto, independente do diretório de trabalho
+CSV_AEROPORTOS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils', 'br-us-airports.csv'
+)
+
+
+@lru_cache(maxsize=None)
+def indice_aeroportos(csv_path=CSV_AEROPORTOS):
+    """Coordenadas (latitude_deg, longitude_deg) indexadas por iata_code, lidas uma vez por processo"""
+    try:
+        df = pd.read_csv(csv_path, sep=';', usecols=['iata_code', 'latitude_deg', 'longitude_deg'])
+    except (OSError, ValueError):
+        return pd.DataFrame(columns=['latitude_deg', 'longitude_deg'], index=pd.Index([], name='iata_code'))
+    return df.dropna(subset=['iata_code']).drop_duplicates('iata_code').set_index('iata_code')
+
+
+def coordenadas(iatas, csv_path=CSV_AEROPORTOS):
+    """Arrays (lat, lon) em graus para cada código IATA; NaN para aeroportos desconhecidos"""
+    coords = indice_aeroportos(csv_path).reindex(list(iatas))
+    return coords['latitude_deg'].to_numpy(dtype=float), coords['longitude_deg'].to_numpy(dtype=float)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distância em linha reta (km) entre pares de pontos; aceita escalares ou arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return RAIO_TERRA_KM * 2 * np.arcsin(np.sqrt(a))
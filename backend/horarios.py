@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+
+from backend.duracao import minutos_hhmm_serie
+from backend.pareto import nao_dominados, nao_dominados_3d
+
+MINUTOS_DIA = 24 * 60
+
+
+def _minutos_data(serie):
+    """Minutos desde 1970-01-01 00:00 de cada data; NaN quando não há data"""
+    datas = pd.to_datetime(serie, errors='coerce')
+    return ((datas - pd.Timestamp(0)) / pd.Timedelta(minutes=1)).to_numpy(dtype=float)
+
+
+def parametros(config):
+    """(conexão mínima, espera máxima) em minutos; espera máxima None = sem limite"""
+    return config.get('conexao_minima_min', 60), config.get('espera_maxima_min')
+
+
+class GradeHorarios:
+    """Índice expandido no tempo: janela de partida de cada oferta, por segmento e em ordem.
+
+    Cada oferta (ID global) pode partir em qualquer instante de [inicio, fim], em minutos
+    desde 1970. Voos com data e horário têm inicio == fim; voos sem horário podem partir
+    a qualquer hora do dia, e carros entre a retirada e o último instante que ainda permite
+    a entrega até o fim da locação. Sem data, a janela é (-inf, inf). A chegada é a partida
+    mais a duração do trecho (só a ida nos voos).
+
+    Dentro de cada segmento (e modo) as ofertas ficam ordenadas pelo fim da janela, então
+    as ofertas que ainda podem ser pegas após uma chegada formam um sufixo achado por busca
+    binária.
+    """
+
+    def __init__(self, inicio, fim, duracao, origens, destinos, n_voos):
+        self.inicio = np.asarray(inicio, dtype=float)
+        self.fim = np.asarray(fim, dtype=float)
+        self.duracao = np.asarray(duracao, dtype=float)
+        modos = np.where(np.arange(len(self.inicio)) < n_voos, 'voo', 'carro')
+
+        self._vazio = (np.empty(0, dtype=int), np.empty(0))
+        self._segmentos = {}
+        if len(self.inicio) == 0:
+            return
+
+        grupos = pd.DataFrame({'origem': origens, 'destino': destinos}).groupby(['origem', 'destino'], sort=False).indices
+        for (origem, destino), ids in grupos.items():
+            ids = np.asarray(ids, dtype=int)
+            ids = ids[np.argsort(self.fim[ids], kind='stable')]
+            self._segmentos[origem, destino, None] = (ids, self.fim[ids])
+            for modo in ('voo', 'carro'):
+                do_modo = ids[modos[ids] == modo]
+                self._segmentos[origem, destino, modo] = (do_modo, self.fim[do_modo])
+
+    @classmethod
+    def from_frames(cls, df_voos, df_carros, ida_min):
+        """Janelas a partir dos DataFrames processados pelo engine (ida_min: duração da ida)"""
+        dia = _minutos_data(df_voos['data_ida'])
+        saida = minutos_hhmm_serie(df_voos['ida_saida']).to_numpy(dtype=float)
+        tem_horario = np.isfinite(saida)
+        voo_inicio = np.where(tem_horario, dia + np.nan_to_num(saida), dia)
+        voo_fim = np.where(tem_horario, voo_inicio, dia + MINUTOS_DIA - 1)
+
+        retirada = _minutos_data(df_carros['data_inicio'])
+        entrega = _minutos_data(df_carros['data_fim']) if 'data_fim' in df_carros.columns else np.full(len(df_carros), np.nan)
+        entrega = np.where(np.isfinite(entrega), entrega, retirada)
+        carro_duracao = df_carros['duracao_min'].to_numpy(dtype=float)
+        carro_fim = np.maximum(entrega + MINUTOS_DIA - 1 - carro_duracao, retirada)
+
+        inicio = np.concatenate([voo_inicio, retirada])
+        fim = np.concatenate([voo_fim, carro_fim])
+        sem_data = ~np.isfinite(inicio)
+        inicio[sem_data] = -np.inf
+        fim[sem_data] = np.inf
+
+        return cls(
+            inicio, fim,
+            np.concatenate([np.asarray(ida_min, dtype=float), carro_duracao]),
+            df_voos['origem'].tolist() + df_carros['local_retirada'].tolist(),
+            df_voos['destino'].tolist() + df_carros['local_entrega'].tolist(),
+            len(df_voos),
+        )
+
+    def segmento(self, origem, destino, modo=None):
+        """(IDs, fim da janela) das ofertas do segmento em ordem crescente do fim"""
+        return self._segmentos.get((origem, destino, modo), self._vazio)
+
+
+def propagar(grade, chegadas, ofertas, conexao, espera_max=None):
+    """Pegar ofertas[i] depois de chegar em chegadas[i] (elemento a elemento).
+
+    A partida é o primeiro instante da janela da oferta após a chegada mais a conexão
+    mínima; chegada -inf indica o primeiro trecho, que não tem espera.
+
+    Returns:
+        (partidas, esperas, novas chegadas, viável)
+    """
+    chegadas = np.asarray(chegadas, dtype=float)
+    partidas = np.maximum(chegadas + conexao, grade.inicio[ofertas])
+    with np.errstate(invalid='ignore'):
+        esperas = np.where(np.isneginf(chegadas), 0.0, partidas - chegadas)
+    viavel = partidas <= grade.fim[ofertas]
+    if espera_max is not None:
+        viavel &= esperas <= espera_max
+    return partidas, esperas, partidas + grade.duracao[ofertas], viavel
+
+
+def conectar(chegadas, fins, conexao):
+    """Pares (rótulo, posição) em que a oferta da posição ainda pode ser pega após a chegada.
+
+    fins está em ordem crescente, então as ofertas viáveis de cada rótulo são o sufixo que
+    começa na busca binária de chegada + conexão; só os pares viáveis são montados.
+    """
+    inicio = np.searchsorted(fins, np.asarray(chegadas, dtype=float) + conexao, side='left')
+    contagens = len(fins) - inicio
+    rotulo = np.repeat(np.arange(len(inicio)), contagens)
+    posicao = np.arange(int(contagens.sum())) + np.repeat(inicio - np.cumsum(contagens) + contagens, contagens)
+    return rotulo, posicao
+
+
+def estender(c, t, h, ids, fins, grade, custos, tempos, conexao, espera_max=None):
+    """Estende os rótulos (custo, tempo, chegada) pelas ofertas viáveis de um segmento.
+
+    O tempo soma a duração da oferta e a espera antes da partida.
+
+    Returns:
+        (custos, tempos, chegadas, rótulo pai, oferta) dos novos rótulos
+    """
+    rotulo, posicao = conectar(h, fins, conexao)
+    ofertas = ids[posicao]
+    _, esperas, chegadas, viavel = propagar(grade, h[rotulo], ofertas, conexao, espera_max)
+    rotulo, ofertas = rotulo[viavel], ofertas[viavel]
+    return (c[rotulo] + custos[ofertas], t[rotulo] + esperas[viavel] + tempos[ofertas],
+            chegadas[viavel], rotulo, ofertas)
+
+
+def reduzir(c, t, h, espera_max=None):
+    """Índices dos rótulos parciais que não são dominados por nenhum outro.
+
+    Com a espera somada ao tempo, o que decide o futuro de um rótulo é a chegada h (quais
+    partidas ainda são viáveis) e t - h (o tempo final é t - h + partida + duração, e a
+    partida não diminui com h). Um rótulo domina outro com custo, chegada e t - h menores
+    ou iguais. Rótulos sem chegada definida (-inf: nenhuma oferta datada até aqui) não têm
+    espera no próximo trecho e são comparados só entre si, por (custo, tempo). Com espera
+    máxima, chegar antes pode tornar uma partida inviável, então só rótulos com a mesma
+    chegada são comparados.
+
+    Returns:
+        índices em ordem crescente de (custo, tempo)
+    """
+    sem_chegada = np.isneginf(h)
+    grupos = [np.flatnonzero(sem_chegada)]
+    datados = np.flatnonzero(~sem_chegada)
+    if espera_max is None:
+        manter = [grupos[0][nao_dominados(c[grupos[0]], t[grupos[0]])],
+                  datados[nao_dominados_3d(c[datados], h[datados], t[datados] - h[datados])]]
+    else:
+        _, grupo = np.unique(h[datados], return_inverse=True)
+        grupos.extend(datados[grupo == g] for g in range(grupo.max() + 1 if len(grupo) else 0))
+        manter = [g[nao_dominados(c[g], t[g])] for g in grupos]
+    manter = np.concatenate(manter)
+    return manter[np.lexsort((t[manter], c[manter]))]
+
+
+def espera_itinerario(grade, ofertas, conexao, espera_max=None):
+    """Espera total de um itinerário em ordem; None se alguma conexão for inviável"""
+    chegada, total = -np.inf, 0.0
+    for oferta in ofertas:
+        _, espera, chegada, viavel = propagar(grade, chegada, oferta, conexao, espera_max)
+        if not viavel:
+            return None
+        total += float(espera)
+    return total
+
+
+def fronteira_rota_horarios(segmentos, grade, custos, tempos, conexao, espera_max=None, custo_max=np.inf):
+    """Versão de fronteira_rota com horários: só conexões viáveis e espera no tempo.
+
+    Os rótulos parciais carregam também a chegada e são reduzidos por reduzir(), já que
+    chegar mais cedo pode liberar partidas mais baratas no trecho seguinte; no último
+    segmento a redução volta a ser em (custo, tempo).
+
+    Args:
+        segmentos: lista de (IDs, fim da janela) por segmento, como em GradeHorarios.segmento
+
+    Returns:
+        (ids, custos, tempos) como em fronteira_rota
+    """
+    custos = np.asarray(custos, dtype=float)
+    tempos = np.asarray(tempos, dtype=float)
+
+    rot_ids = np.empty((1, 0), dtype=int)
+    rot_c, rot_t, rot_h = np.zeros(1), np.zeros(1), np.full(1, -np.inf)
+
+    for k, (ids, fins) in enumerate(segmentos):
+        novo_c, novo_t, novo_h, pai, oferta = estender(
+            rot_c, rot_t, rot_h, ids, fins, grade, custos, tempos, conexao, espera_max)
+
+        dentro = np.flatnonzero(novo_c <= custo_max)
+        if k == len(segmentos) - 1:
+            manter = dentro[nao_dominados(novo_c[dentro], novo_t[dentro])]
+        else:
+            manter = dentro[reduzir(novo_c[dentro], novo_t[dentro], novo_h[dentro], espera_max)]
+        if len(manter) == 0:
+            return np.empty((0, len(segmentos)), dtype=int), np.empty(0), np.empty(0)
+
+        rot_ids = np.column_stack([rot_ids[pai[manter]], oferta[manter]])
+        rot_c, rot_t, rot_h = novo_c[manter], novo_t[manter], novo_h[manter]
+
+    return rot_ids, rot_c, rot_t
@@ -0,0 +1,39 @@
+import heapq
+from itertools import islice
+
+
+def k_melhores(valores, k=None):
+    """Enumera as combinações (uma opção por segmento) em ordem crescente da soma dos valores.
+
+    valores[s] é a sequência de valores das opções do segmento s. Uma fila de prioridade
+    parte da combinação com o menor valor de cada segmento e só expande vizinhos quando
+    uma combinação sai da fila, então memória e trabalho crescem com k e não com o produto
+    do número de opções. Cada combinação tem um único pai (a que decrementa a última
+    coordenada não nula), o que evita duplicatas sem conjunto de visitados.
+
+    Yields:
+        (soma, indices): índices referem-se às posições originais em cada valores[s]
+    """
+    if not valores or any(len(v) == 0 for v in valores):
+        return iter(())
+
+    # Ordenação estável por segmento: em empates prevalece a ordem original
+    ordens = [sorted(range(len(v)), key=v.__getitem__) for v in valores]
+    ordenados = [[v[i] for i in ordem] for v, ordem in zip(valores, ordens)]
+
+    def gerar():
+        inicio = (0,) * len(ordenados)
+        contador = 0  # Desempate por ordem de inserção
+        fila = [(sum(seg[0] for seg in ordenados), contador, inicio, 0)]
+        while fila:
+            total, _, posicoes, ultimo = heapq.heappop(fila)
+            yield total, tuple(ordem[p] for ordem, p in zip(ordens, posicoes))
+            for j in range(ultimo, len(posicoes)):
+                p = posicoes[j]
+                if p + 1 < len(ordenados[j]):
+                    filho = posicoes[:j] + (p + 1,) + posicoes[j + 1:]
+                    contador += 1
+                    # Soma do filho a partir da do pai: só o segmento j muda
+                    heapq.heappush(fila, (total + (ordenados[j][p + 1] - ordenados[j][p]), contador, filho, j))
+
+    return gerar() if k is None else islice(gerar(), k)
@@ -0,0 +1,101 @@
+import logging
+import sqlite3
+
+from backend.duracao import minutos, minutos_hhmm
+
+logger = logging.getLogger(__name__)
+
+
+def _criar_tabelas(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS voos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            origem TEXT, destino TEXT, data_ida TEXT, data_volta TEXT,
+            companhia TEXT, preco_bruto TEXT, preco_numerico REAL,
+            ida_saida TEXT, ida_chegada TEXT, ida_duracao TEXT, ida_escalas TEXT,
+            volta_saida TEXT, volta_chegada TEXT, volta_duracao TEXT, volta_escalas TEXT,
+            coletado_em DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS aluguel_carros (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            local_retirada TEXT, local_entrega TEXT,
+            data_inicio TEXT, data_fim TEXT,
+            categoria TEXT, locadora TEXT, capacidade TEXT,
+            preco_total TEXT, preco_numerico REAL,
+            valor_diaria REAL,
+            dias_viagem INTEGER,
+            tempo_viagem_horas TEXT,
+            distancia_km INTEGER,
+            mesmo_local INTEGER,
+            coletado_em DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _colunas_minutos(conn):
+    """Durações em minutos gravadas na coleta; linhas antigas são preenchidas a partir dos textos"""
+    novas = {
+        'voos': ('ida_duracao_min', 'volta_duracao_min'),
+        'aluguel_carros': ('tempo_viagem_min',),
+    }
+    for tabela, colunas in novas.items():
+        existentes = {linha[1] for linha in conn.execute(f"PRAGMA table_info({tabela})")}
+        for coluna in colunas:
+            if coluna not in existentes:
+                conn.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} INTEGER")
+
+    pendentes = conn.execute(
+        "SELECT id, ida_duracao, volta_duracao FROM voos WHERE ida_duracao_min IS NULL").fetchall()
+    conn.executemany(
+        "UPDATE voos SET ida_duracao_min = ?, volta_duracao_min = ? WHERE id = ?",
+        [(minutos(ida), minutos(volta) if volta else None, id_voo) for id_voo, ida, volta in pendentes])
+
+    pendentes = conn.execute(
+        "SELECT id, tempo_viagem_horas FROM aluguel_carros "
+        "WHERE tempo_viagem_min IS NULL AND tempo_viagem_horas IS NOT NULL").fetchall()
+    conn.executemany(
+        "UPDATE aluguel_carros SET tempo_viagem_min = ? WHERE id = ?",
+        [(minutos_hhmm(tempo), id_carro) for id_carro, tempo in pendentes])
+
+
+def _indices_rotas(conn):
+    """Índices compostos para as consultas por trecho (engine) e para a checagem de duplicados"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_voos_trecho ON voos (origem, destino, data_ida)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_carros_trecho "
+        "ON aluguel_carros (local_retirada, local_entrega, data_inicio)")
+
+
+# A posição na lista é a versão do esquema (PRAGMA user_version) após aplicar a migração.
+# Todas são idempotentes, então bancos criados antes do versionamento passam por elas sem erro.
+MIGRACOES = [
+    _criar_tabelas,
+    _colunas_minutos,
+    _indices_rotas,
+]
+VERSAO_ATUAL = len(MIGRACOES)
+
+
+def migrar(conn):
+    """Aplica as migrações pendentes na conexão; retorna a versão final do esquema"""
+    versao = conn.execute("PRAGMA user_version").fetchone()[0]
+    if versao >= VERSAO_ATUAL:
+        return versao
+
+    for numero, migracao in enumerate(MIGRACOES[versao:], start=versao + 1):
+        with conn:  # Commit ao fim de cada migração, junto com a nova versão
+            migracao(conn)
+            conn.execute(f"PRAGMA user_version = {numero}")
+        logger.info("Esquema do banco migrado para a versão %d (%s)", numero, migracao.__name__)
+    return VERSAO_ATUAL
+
+
+def garantir_esquema(db_path):
+    """Abre o banco, aplica as migrações pendentes e fecha a conexão"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return migrar(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,282 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+
+def nao_dominados(custos, tempos, manter_empates=False):
+    """Índices dos pontos (custo, tempo) não dominados, em ordem crescente de custo.
+
+    Varredura O(n log n): ordena por custo (e tempo no empate) e mantém um ponto só se
+    ele for estritamente mais rápido que todos os mais baratos já vistos. Por padrão
+    pontos repetidos são reduzidos a um único representante; com manter_empates=True
+    todos os pontos com objetivos idênticos a um ponto não dominado são mantidos.
+    """
+    custos = np.asarray(custos, dtype=float)
+    tempos = np.asarray(tempos, dtype=float)
+    if len(custos) == 0:
+        return np.empty(0, dtype=int)
+
+    ordem = np.lexsort((tempos, custos))
+    custos_ord = custos[ordem]
+    tempos_ord = tempos[ordem]
+
+    if not manter_empates:
+        # Melhor tempo entre os pontos anteriores na ordem (mais baratos ou empatados)
+        melhor_anterior = np.minimum.accumulate(np.concatenate([[np.inf], tempos_ord[:-1]]))
+        return ordem[tempos_ord < melhor_anterior]
+
+    # Com empates: o ponto precisa ter o menor tempo do seu grupo de custo e ser
+    # estritamente mais rápido que todos os pontos de custo estritamente menor
+    _, inicio_grupo, grupo = np.unique(custos_ord, return_index=True, return_inverse=True)
+    melhor_do_grupo = tempos_ord[inicio_grupo]
+    melhor_mais_barato = np.minimum.accumulate(np.concatenate([[np.inf], melhor_do_grupo[:-1]]))
+    manter = (tempos_ord == melhor_do_grupo[grupo]) & (tempos_ord < melhor_mais_barato[grupo])
+    return ordem[manter]
+
+
+def proximos_da_fronteira(custos, tempos, fronteira, k):
+    """Índices dos k pontos fora da fronteira mais próximos dela.
+
+    A distância é a soma de custo e tempo normalizados pelos intervalos da própria
+    fronteira; empates preservam a ordem original.
+    """
+    custos = np.asarray(custos, dtype=float)
+    tempos = np.asarray(tempos, dtype=float)
+    fronteira = np.asarray(fronteira, dtype=int)
+    if len(fronteira) == 0 or k <= 0:
+        return np.empty(0, dtype=int)
+
+    restantes = np.setdiff1d(np.arange(len(custos)), fronteira)
+    if len(restantes) == 0:
+        return restantes
+
+    min_c, max_c = custos[fronteira].min(), custos[fronteira].max()
+    min_t, max_t = tempos[fronteira].min(), tempos[fronteira].max()
+    range_c = max_c - min_c if max_c > min_c else 1
+    range_t = max_t - min_t if max_t > min_t else 1
+
+    distancia = (custos[restantes] - min_c) / range_c + (tempos[restantes] - min_t) / range_t
+    return restantes[np.argsort(distancia, kind='stable')[:k]]
+
+
+def hipervolume(custos, tempos, referencia):
+    """Área dominada pelos pontos (custo, tempo) e limitada pelo ponto de referência.
+
+    Pontos que não são estritamente melhores que a referência nos dois objetivos não
+    contribuem. Varredura O(n log n) sobre a fronteira ordenada por custo.
+    """
+    custos = np.asarray(custos, dtype=float)
+    tempos = np.asarray(tempos, dtype=float)
+    ref_c, ref_t = referencia
+    dentro = (custos < ref_c) & (tempos < ref_t)
+    custos, tempos = custos[dentro], tempos[dentro]
+    if len(custos) == 0:
+        return 0.0
+
+    fronteira = nao_dominados(custos, tempos)  # Custo crescente, tempo decrescente
+    c, t = custos[fronteira], tempos[fronteira]
+    larguras = np.append(c[1:], ref_c) - c
+    return float(np.sum(larguras * (ref_t - t)))
+
+
+def otimos_ponderados(custos, tempos, orcamentos, alphas, intervalos=None):
+    """Índice do ótimo de alpha * custo_norm + (1 - alpha) * tempo_norm para cada
+    (orçamento, alpha), a partir de uma única fronteira em ordem crescente de custo.
+
+    Os ótimos da soma ponderada estão na envoltória convexa inferior da fronteira. O corte
+    pelo orçamento é um prefixo da fronteira e a cadeia monótona (um ponto sai da pilha
+    quando fica acima do segmento entre o anterior e o novo ponto) processa os pontos
+    nessa mesma ordem, então a envoltória de cada orçamento é a pilha no momento do corte.
+    A normalização usa os intervalos do prefixo, ou intervalos[b] = (custo, tempo) quando
+    informados. Em cada envoltória o ótimo sai de uma busca binária nas inclinações das
+    arestas.
+
+    Returns:
+        array (len(orcamentos), len(alphas)) de índices na fronteira; -1 quando nada cabe
+    """
+    custos = np.asarray(custos, dtype=float)
+    tempos = np.asarray(tempos, dtype=float)
+    alphas = np.asarray(alphas, dtype=float)
+    orcamentos = np.asarray(orcamentos, dtype=float)
+    resultado = np.full((len(orcamentos), len(alphas)), -1, dtype=int)
+
+    pilha = []
+    proximo = 0
+    for b in np.argsort(orcamentos, kind='stable'):
+        # Estender a cadeia monótona até o corte deste orçamento
+        fim = int(np.searchsorted(custos, orcamentos[b], side='right'))
+        for i in range(proximo, fim):
+            while len(pilha) >= 2:
+                a, m = pilha[-2], pilha[-1]
+                cruz = (custos[m] - custos[a]) * (tempos[i] - tempos[a]) - (tempos[m] - tempos[a]) * (custos[i] - custos[a])
+                if cruz > 0:
+                    break
+                pilha.pop()
+            pilha.append(i)
+        proximo = max(proximo, fim)
+        if fim == 0:
+            continue
+
+        if intervalos is not None:
+            range_c, range_t = intervalos[b]
+        else:
+            range_c = custos[fim - 1] - custos[0] or 1
+            range_t = tempos[:fim].max() - tempos[:fim].min() or 1
+        vertices = np.array(pilha)
+        # Inclinações crescentes das arestas; avançar para o próximo vértice compensa
+        # enquanto a inclinação é menor que -(peso do custo / peso do tempo)
+        inclinacoes = np.diff(tempos[vertices]) / np.diff(custos[vertices])
+        with np.errstate(divide='ignore'):
+            limite = -(alphas / range_c) / ((1 - alphas) / range_t)
+        resultado[b] = vertices[np.searchsorted(inclinacoes, limite, side='left')]
+    return resultado
+
+
+class ParetoArchive:
+    """Arquivo incremental de soluções não dominadas em (custo, tempo).
+
+    As entradas formam uma escada ordenada por custo crescente e tempo estritamente
+    decrescente, então inserção e consulta de dominância usam busca binária. Com
+    epsilon=(eps_custo, eps_tempo) a dominância é avaliada sobre uma grade: fica no
+    máximo uma solução por célula, o que limita o tamanho do arquivo mesmo quando a
+    fronteira real é muito densa.
+    """
+
+    def __init__(self, epsilon=None):
+        self.epsilon = epsilon
+        self._chaves_c = []
+        self._chaves_t = []
+        self._pontos = []
+        self._itens = []
+
+    def __len__(self):
+        return len(self._itens)
+
+    def _chave(self, custo, tempo):
+        if self.epsilon is None:
+            return custo, tempo
+        eps_c, eps_t = self.epsilon
+        return np.floor(custo / eps_c), np.floor(tempo / eps_t)
+
+    def domina(self, custo, tempo):
+        """True se algum ponto do arquivo domina (ou empata com) (custo, tempo)"""
+        kc, kt = self._chave(custo, tempo)
+        i = bisect_right(self._chaves_c, kc) - 1
+        return i >= 0 and self._chaves_t[i] <= kt
+
+    def add(self, custo, tempo, item=None):
+        """Insere o ponto se ele não for dominado; retorna True quando o arquivo muda"""
+        kc, kt = self._chave(custo, tempo)
+        i = bisect_right(self._chaves_c, kc) - 1
+
+        if i >= 0 and self._chaves_t[i] <= kt:
+            if (self._chaves_c[i], self._chaves_t[i]) != (kc, kt) or self.epsilon is None:
+                return False
+            # Mesma célula da grade: fica o ponto que domina o outro ou, se nenhum
+            # domina, o mais próximo do canto inferior da célula
+            c_atual, t_atual = self._pontos[i]
+            if custo <= c_atual and tempo <= t_atual:
+                substituir = (custo, tempo) != (c_atual, t_atual)
+            elif c_atual <= custo and t_atual <= tempo:
+                substituir = False
+            else:
+                canto_c, canto_t = kc * self.epsilon[0], kt * self.epsilon[1]
+                substituir = (
+                    (custo - canto_c) / self.epsilon[0] + (tempo - canto_t) / self.epsilon[1]
+                    < (c_atual - canto_c) / self.epsilon[0] + (t_atual - canto_t) / self.epsilon[1]
+                )
+            if substituir:
+                self._pontos[i] = (custo, tempo)
+                self._itens[i] = item
+            return substituir
+
+        # Remover as entradas que o novo ponto domina: são contíguas a partir da posição de inserção
+        inicio = bisect_left(self._chaves_c, kc)
+        fim = inicio
+        while fim < len(self._chaves_t) and self._chaves_t[fim] >= kt:
+            fim += 1
+
+        self._chaves_c[inicio:fim] = [kc]
+        self._chaves_t[inicio:fim] = [kt]
+        self._pontos[inicio:fim] = [(custo, tempo)]
+        self._itens[inicio:fim] = [item]
+        return True
+
+    def extend(self, custos, tempos, itens=None):
+        """Insere vários pontos; pré-filtra pela varredura para evitar inserções inúteis"""
+        custos = np.asarray(custos, dtype=float)
+        tempos = np.asarray(tempos, dtype=float)
+        candidatos = nao_dominados(custos, tempos) if self.epsilon is None else np.lexsort((tempos, custos))
+        for i in candidatos:
+            self.add(float(custos[i]), float(tempos[i]), itens[i] if itens is not None else int(i))
+
+    def pontos(self):
+        """Pontos (custo, tempo) do arquivo em ordem crescente de custo"""
+        return list(self._pontos)
+
+    def itens(self):
+        """Itens associados aos pontos, na mesma ordem de pontos()"""
+        return list(self._itens)
+
+
+def nao_dominados_3d(custos, segundo, terceiro):
+    """Índices dos pontos não dominados em três critérios (todos minimizados), em ordem
+    crescente de custo.
+
+    Varredura por custo crescente: cada ponto é comparado com a escada (segundo, terceiro)
+    dos pontos já mantidos, guardada num ParetoArchive, então teste e inserção usam busca
+    binária. Pontos repetidos são reduzidos a um único representante.
+    """
+    custos = np.asarray(custos, dtype=float)
+    segundo = np.asarray(segundo, dtype=float)
+    terceiro = np.asarray(terceiro, dtype=float)
+    escada = ParetoArchive()
+    manter = [i for i in np.lexsort((terceiro, segundo, custos)).tolist()
+              if escada.add(float(segundo[i]), float(terceiro[i]))]
+    return np.array(manter, dtype=int)
+
+
+def fronteira_rota(segmentos, custos, tempos, custo_max=np.inf):
+    """Fronteira de Pareto exata de uma sequência fixa de segmentos.
+
+    Rótulos parciais (custo, tempo) são estendidos segmento a segmento e reduzidos aos
+    não dominados a cada passo, então o trabalho cresce com o tamanho das fronteiras e
+    não com o produto do número de ofertas.
+
+    Args:
+        segmentos: lista com um array de IDs globais de ofertas por segmento
+        custos, tempos: vetores de custo e tempo indexados pelo ID global
+        custo_max: rótulos parciais acima deste custo são descartados
+
+    Returns:
+        (ids, custos, tempos): matriz (L, n_segmentos) de IDs e os objetivos de cada rótulo,
+        em ordem crescente de custo
+    """
+    custos = np.asarray(custos, dtype=float)
+    tempos = np.asarray(tempos, dtype=float)
+
+    rot_ids = np.empty((1, 0), dtype=int)
+    rot_c = np.zeros(1)
+    rot_t = np.zeros(1)
+
+    for ofertas in segmentos:
+        ofertas = np.asarray(ofertas, dtype=int)
+        # Uma oferta dominada dentro do próprio segmento nunca compõe um rótulo não dominado
+        ofertas = ofertas[nao_dominados(custos[ofertas], tempos[ofertas])]
+
+        # Extensão de todos os rótulos por todas as ofertas da fronteira do segmento
+        novo_c = (rot_c[:, None] + custos[ofertas][None, :]).ravel()
+        novo_t = (rot_t[:, None] + tempos[ofertas][None, :]).ravel()
+        origem_rotulo = np.repeat(np.arange(len(rot_c)), len(ofertas))
+        oferta = np.tile(ofertas, len(rot_c))
+
+        dentro = novo_c <= custo_max
+        manter = np.flatnonzero(dentro)[nao_dominados(novo_c[dentro], novo_t[dentro])]
+        if len(manter) == 0:
+            return np.empty((0, len(segmentos)), dtype=int), np.empty(0), np.empty(0)
+
+        rot_ids = np.column_stack([rot_ids[origem_rotulo[manter]], oferta[manter]])
+        rot_c = novo_c[manter]
+        rot_t = novo_t[manter]
+
+    return rot_ids, rot_c, rot_t
@@ -0,0 +1,65 @@
+import numpy as np
+
+
+class PoolCandidatos:
+    """Candidatos já deduplicados, filtrados pelo orçamento e reduzidos à fronteira, prontos
+    para serem reordenados por qualquer alpha sem gerar rotas de novo.
+
+    As ordens por custo e por tempo e os objetivos normalizados são calculados uma vez;
+    ranquear() só ordena um vetor do tamanho do pool e guarda o resultado por (alpha, n).
+    """
+
+    def __init__(self, candidatos, materializar=None):
+        self.candidatos = list(candidatos)
+        self._materializar = materializar
+        self._custos = np.array([c.custo for c in self.candidatos], dtype=float)
+        self._tempos = np.array([c.tempo for c in self.candidatos], dtype=float)
+
+        # Mesmos intervalos globais da ordenação do engine (1 quando todos os valores são iguais)
+        if len(self.candidatos):
+            range_c = np.ptp(self._custos) or 1
+            range_t = np.ptp(self._tempos) or 1
+            self._custo_norm = (self._custos - self._custos.min()) / range_c
+            self._tempo_norm = (self._tempos - self._tempos.min()) / range_t
+        else:
+            self._custo_norm = self._tempo_norm = np.empty(0)
+
+        # Ordenação estável: em empates prevalece a ordem da fronteira
+        self._por_custo = np.argsort(self._custos, kind='stable')
+        self._por_tempo = np.argsort(self._tempos, kind='stable')
+        self._ordens = {}
+        self._solucoes = {}
+
+    def __len__(self):
+        return len(self.candidatos)
+
+    def ordem(self, alpha, n=50):
+        """Índices dos n melhores candidatos para o alpha.
+
+        alpha >= 0.7 ordena por custo, alpha <= 0.3 por tempo e, entre os dois, pelo
+        score alpha * custo_norm + (1 - alpha) * tempo_norm.
+        """
+        if alpha >= 0.7:
+            return self._por_custo[:n]
+        if alpha <= 0.3:
+            return self._por_tempo[:n]
+
+        chave = (alpha, n)
+        if chave not in self._ordens:
+            score = alpha * self._custo_norm + (1 - alpha) * self._tempo_norm
+            self._ordens[chave] = np.argsort(score, kind='stable')[:n]
+        return self._ordens[chave]
+
+    def selecionar(self, alpha, n=50):
+        """Candidatos (compactos) na ordem do alpha"""
+        return [self.candidatos[i] for i in self.ordem(alpha, n)]
+
+    def ranquear(self, alpha, n=50):
+        """Soluções materializadas na ordem do alpha; cada itinerário é montado uma única vez"""
+        solucoes = []
+        for i in self.ordem(alpha, n).tolist():
+            if i not in self._solucoes:
+                self._solucoes[i] = self._materializar(self.candidatos[i])
+            # Cópia rasa para que marcações da interface não vazem entre ordenações
+            solucoes.append(dict(self._solucoes[i]))
+        return solucoes
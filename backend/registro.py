@@ -0,0 +1,146 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource  # Indisponível no Windows
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_PADRAO = 'solve_log.db'
+
+# Faixas de tamanho do problema (linhas de voos + carros lidas do banco)
+FAIXAS_LINHAS = [0, 100, 1_000, 10_000, 100_000, np.inf]
+ROTULOS_FAIXAS = ['<100', '100-1k', '1k-10k', '10k-100k', '>=100k']
+
+
+def _criar_tabela(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS execucoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            registrado_em DATETIME DEFAULT CURRENT_TIMESTAMP,
+            operacao TEXT, modo TEXT, workers INTEGER,
+            config_hash TEXT, versao_dados TEXT,
+            n_origens INTEGER, n_destinos INTEGER, linhas INTEGER,
+            total_ms REAL, fases TEXT, contadores TEXT,
+            pico_rss_mb REAL, n_solucoes INTEGER, erro TEXT
+        )
+    ''')
+
+
+def caminho_log(db_path, config):
+    """Arquivo do log para a configuração: None quando desativado (config['log_execucoes'] = False).
+
+    Por padrão fica ao lado do banco de dados, e não dentro dele: escrever no banco mudaria o
+    mtime usado na versão dos dados e invalidaria o cache do engine a cada execução.
+    """
+    destino = config.get('log_execucoes', True)
+    if not destino:
+        return None
+    if destino is True:
+        return os.path.join(os.path.dirname(os.path.abspath(db_path)), ARQUIVO_PADRAO)
+    return destino
+
+
+def _resumo(valor):
+    return hashlib.sha1(json.dumps(valor, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def pico_rss_mb():
+    """Pico de memória residente do processo (não só da execução); None sem o módulo resource"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return pico / 2**20 if sys.platform == 'darwin' else pico / 2**10
+
+
+def registrar(caminho, operacao, config, versao, metadados, linhas, n_solucoes, erro=None, modo=None):
+    """Acrescenta uma execução ao log; falhas de escrita só geram um aviso"""
+    registro = (
+        operacao, modo, config.get('workers') or 1,
+        _resumo({k: v for k, v in config.items() if k != 'origem'}), _resumo(versao),
+        len(config.get('origens', [config['origem']])), len(config['destinos']), linhas,
+        metadados.total_ns / 1e6, json.dumps(metadados.fases), json.dumps(metadados.contadores),
+        pico_rss_mb(), n_solucoes, erro,
+    )
+    try:
+        conn = sqlite3.connect(caminho, timeout=1)
+        try:
+            with conn:
+                _criar_tabela(conn)
+                conn.execute(
+                    "INSERT INTO execucoes (operacao, modo, workers, config_hash, versao_dados, n_origens, "
+                    "n_destinos, linhas, total_ms, fases, contadores, pico_rss_mb, n_solucoes, erro) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", registro)
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Não foi possível registrar a execução em %s: %s", caminho, e)
+
+
+def carregar(caminho, desde=None):
+    conn = sqlite3.connect(caminho)
+    try:
+        _criar_tabela(conn)
+        consulta, params = "SELECT * FROM execucoes", ()
+        if desde:
+            consulta, params = consulta + " WHERE registrado_em >= ?", (desde,)
+        return pd.read_sql_query(consulta, conn, params=params)
+    finally:
+        conn.close()
+
+
+def relatorio(df, por=('operacao', 'n_destinos', 'faixa_linhas'), percentis=(50, 90, 99)):
+    """Percentis da latência (total_ms) em cada grupo de tamanho do problema.
+
+    `por` aceita as colunas do log mais 'faixa_linhas' (linhas lidas, em ordens de grandeza)
+    e 'semana' (ISO), para comparar o mesmo tamanho de problema ao longo do tempo.
+    """
+    df = df.copy()
+    df['faixa_linhas'] = pd.cut(df['linhas'], FAIXAS_LINHAS, right=False, labels=ROTULOS_FAIXAS)
+    df['semana'] = pd.to_datetime(df['registrado_em']).dt.strftime('%G-W%V')
+    grupos = df.groupby(list(por), dropna=False, observed=True)['total_ms']
+    tabela = grupos.agg(execucoes='count', media='mean')
+    for p in percentis:
+        tabela[f'p{p}'] = grupos.quantile(p / 100)
+    tabela['max'] = grupos.max()
+    return tabela.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Percentis de latência do log de execuções do otimizador")
+    parser.add_argument('log', nargs='?', default=os.path.join('data', ARQUIVO_PADRAO), help="Arquivo do log")
+    parser.add_argument('--desde', help="Data inicial (AAAA-MM-DD)")
+    parser.add_argument('--por', nargs='+', default=['operacao', 'n_destinos', 'faixa_linhas'],
+                        help="Colunas de agrupamento (ex.: semana modo n_destinos)")
+    parser.add_argument('--fase', help="Usar o tempo de uma fase (ex.: geracao) em vez do total")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        parser.error(f"log não encontrado: {args.log}")
+    df = carregar(args.log, args.desde)
+    if df.empty:
+        print("Nenhuma execução registrada")
+        return
+    if args.fase:
+        df['total_ms'] = [json.loads(fases).get(args.fase, 0) / 1e6 for fases in df['fases']]
+
+    with pd.option_context('display.max_rows', None, 'display.width', 200, 'display.float_format', '{:,.1f}'.format):
+        print(f"{len(df)} execuções de {df['registrado_em'].min()} a {df['registrado_em'].max()} "
+              f"(gerado em {datetime.now():%Y-%m-%d %H:%M})")
+        print(relatorio(df, args.por).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+import numpy as np
+
+from backend.horarios import estender as estender_horarios, reduzir as reduzir_horarios
+from backend.pareto import nao_dominados
+
+
+def _predecessores(cidades, conexoes):
+    """Bits das cidades com conexão direta para cada cidade (bit i = cidades[i], origem no bit 0)"""
+    pred = [0] * len(cidades)
+    for k, b in enumerate(cidades):
+        for i, a in enumerate(cidades):
+            if i != k and (a, b) in conexoes:
+                pred[k] |= 1 << i
+    return pred
+
+
+def _alcancaveis(restantes, atual, pred):
+    """Condição necessária para completar a rota: todo destino restante tem de onde ser alcançado.
+
+    Um destino ainda não visitado só pode ser atingido a partir da cidade atual ou de
+    outro destino também não visitado. restantes usa o bit k-1 para o destino k.
+    """
+    bits = restantes
+    while bits:
+        d = (bits & -bits).bit_length()
+        bits &= bits - 1
+        fontes = ((restantes << 1) & ~(1 << d)) | (1 << atual)
+        if not pred[d] & fontes:
+            return False
+    return True
+
+
+def rotas_viaveis(origem, destinos, conexoes):
+    """Rotas viáveis na mesma ordem de permutations(destinos).
+
+    Para cada ordem dos destinos a rota é circular quando existe o retorno à origem e
+    linear caso contrário. A busca em profundidade descarta um prefixo assim que falta
+    uma conexão ou algum destino restante fica inalcançável, então as ordens inviáveis
+    não são enumeradas uma a uma.
+    """
+    n = len(destinos)
+    cidades = [origem] + list(destinos)
+    pred = _predecessores(cidades, conexoes)
+    cheio = (1 << n) - 1
+    rotas = []
+
+    def visitar(caminho, mask):
+        atual = caminho[-1]
+        if mask == cheio:
+            rota = [cidades[k] for k in caminho]
+            if (cidades[atual], origem) in conexoes:
+                rota.append(origem)
+            rotas.append(rota)
+            return
+        for k in range(1, n + 1):
+            bit = 1 << (k - 1)
+            if mask & bit or (cidades[atual], cidades[k]) not in conexoes:
+                continue
+            if _alcancaveis(cheio & ~(mask | bit), k, pred):
+                visitar(caminho + [k], mask | bit)
+
+    if n and _alcancaveis(cheio, 0, pred):
+        visitar([0], 0)
+    return rotas
+
+
+def fronteira_destinos(origem, destinos, indice, custos, tempos, custo_max=np.inf,
+                       grade=None, conexao=0, espera_max=None):
+    """Fronteira de Pareto sobre todas as ordens de visita dos destinos (estilo Held-Karp).
+
+    Rótulos (custo, tempo) são mantidos por estado (destinos visitados, cidade atual) e
+    reduzidos aos não dominados, então ordens com o mesmo prefixo compartilham trabalho e
+    o número de estados cresce com 2^n * n em vez de n!. Como em rotas_viaveis, a rota
+    termina na origem quando há retorno a partir do último destino e é linear caso contrário.
+
+    Args:
+        origem, destinos: cidade de partida e destinos a visitar
+        indice: SegmentIndex com as ofertas de cada par (origem, destino)
+        custos, tempos: vetores de custo e tempo indexados pelo ID global
+        custo_max: rótulos parciais acima deste custo são descartados
+        grade: GradeHorarios; quando informada, só conexões viáveis nos horários entram,
+            a espera soma no tempo e os rótulos guardam a chegada (ver backend/horarios.py)
+        conexao, espera_max: conexão mínima e espera máxima (minutos) usadas com a grade
+
+    Returns:
+        (ofertas, custos, tempos): lista de tuplas de IDs por itinerário e os objetivos,
+        com a fronteira de cada cidade final em ordem crescente de custo
+    """
+    custos = np.asarray(custos, dtype=float)
+    tempos = np.asarray(tempos, dtype=float)
+    n = len(destinos)
+    cidades = [origem] + list(destinos)
+    cheio = (1 << n) - 1
+    if n == 0:
+        return [], np.empty(0), np.empty(0)
+
+    # Fronteira de cada arco entre cidades; ofertas dominadas no próprio arco nunca são usadas.
+    # Com horários o arco guarda (IDs, fim da janela) e nenhuma oferta é descartada antes,
+    # porque uma oferta dominada em custo e tempo pode ser a única que parte a tempo.
+    arcos = {}
+    for i, a in enumerate(cidades):
+        for j, b in enumerate(cidades):
+            if i == j:
+                continue
+            if grade is not None:
+                if len(grade.segmento(a, b)[0]):
+                    arcos[i, j] = grade.segmento(a, b)
+                continue
+            ids = indice.segmento(a, b).ids
+            if len(ids):
+                arcos[i, j] = ids[nao_dominados(custos[ids], tempos[ids])]
+    pred = _predecessores(cidades, {(cidades[i], cidades[j]) for i, j in arcos})
+
+    # rotulos[(mask, cidade)] = (custo, tempo, chegada, rótulo pai, cidade pai, oferta)
+    inicial = (np.zeros(1), np.zeros(1), np.full(1, -np.inf),
+               np.zeros(1, dtype=int), np.zeros(1, dtype=int), np.zeros(1, dtype=int))
+    rotulos = {(0, 0): inicial}
+
+    def estender(pedacos, estado, de, arco):
+        c, t, h = estado[:3]
+        if grade is not None:
+            ids, fins = arco
+            novo_c, novo_t, novo_h, pai, oferta = estender_horarios(
+                c, t, h, ids, fins, grade, custos, tempos, conexao, espera_max)
+        else:
+            novo_c = (c[:, None] + custos[arco][None, :]).ravel()
+            novo_t = (t[:, None] + tempos[arco][None, :]).ravel()
+            novo_h = np.full(len(novo_c), -np.inf)
+            pai = np.repeat(np.arange(len(c)), len(arco))
+            oferta = np.tile(arco, len(c))
+        pedacos.append((novo_c, novo_t, novo_h, pai, np.full(len(novo_c), de), oferta))
+
+    def reduzir(pedacos, final=False):
+        c, t, h, pai, pai_cidade, oferta = (np.concatenate(x) for x in zip(*pedacos))
+        dentro = np.flatnonzero(c <= custo_max)
+        if grade is not None and not final:
+            # A chegada só deixa de importar quando o itinerário termina
+            manter = dentro[reduzir_horarios(c[dentro], t[dentro], h[dentro], espera_max)]
+        else:
+            manter = dentro[nao_dominados(c[dentro], t[dentro])]
+        if len(manter) == 0:
+            return None
+        return c[manter], t[manter], h[manter], pai[manter], pai_cidade[manter], oferta[manter]
+
+    # Masks crescentes: todo estado predecessor (mask sem o bit da cidade atual) já foi resolvido
+    for mask in range(1, cheio + 1):
+        for k in range(1, n + 1):
+            bit = 1 << (k - 1)
+            if not mask & bit or not _alcancaveis(cheio & ~mask, k, pred):
+                continue
+            anterior = mask & ~bit
+            pedacos = []
+            for p in ([0] if anterior == 0 else range(1, n + 1)):
+                estado = rotulos.get((anterior, p))
+                if estado is not None and (p, k) in arcos:
+                    estender(pedacos, estado, p, arcos[p, k])
+            if pedacos:
+                reduzido = reduzir(pedacos)
+                if reduzido is not None:
+                    rotulos[mask, k] = reduzido
+
+    def reconstruir(mask, k, i):
+        ids = []
+        while k != 0:
+            _, _, _, pai, pai_cidade, oferta = rotulos[mask, k]
+            ids.append(int(oferta[i]))
+            mask, k, i = mask & ~(1 << (k - 1)), int(pai_cidade[i]), int(pai[i])
+        return ids[::-1]
+
+    ofertas, f_custos, f_tempos = [], [], []
+    for k in range(1, n + 1):
+        estado = rotulos.get((cheio, k))
+        if estado is None:
+            continue
+        if (k, 0) in arcos:
+            # Fechar o ciclo com o retorno à origem
+            pedacos = []
+            estender(pedacos, estado, k, arcos[k, 0])
+            final = reduzir(pedacos, final=True)
+            if final is None:
+                continue
+            for c, t, pai, oferta in zip(final[0], final[1], final[3], final[5]):
+                ofertas.append(tuple(reconstruir(cheio, k, int(pai)) + [int(oferta)]))
+                f_custos.append(c)
+                f_tempos.append(t)
+        else:
+            # Rota linear: os rótulos do estado final ainda estão reduzidos com a chegada
+            fim = nao_dominados(estado[0], estado[1]) if grade is not None else range(len(estado[0]))
+            for i in fim:
+                c, t = estado[0][i], estado[1][i]
+                ofertas.append(tuple(reconstruir(cheio, k, int(i))))
+                f_custos.append(c)
+                f_tempos.append(t)
+
+    return ofertas, np.array(f_custos), np.array(f_tempos)
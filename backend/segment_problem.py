@@ -0,0 +1,179 @@
+import numpy as np
+from pymoo.core.problem import Problem
+from pymoo.core.sampling import Sampling
+from pymoo.core.crossover import Crossover
+from pymoo.core.mutation import Mutation
+
+from backend.horarios import propagar
+from backend.kbest import k_melhores
+
+
+class SegmentTripProblem(Problem):
+    """Problema de viagens com codificação inteira por segmento.
+
+    Gene 0 escolhe a rota (ordem dos destinos) entre as rotas viáveis; o gene k+1
+    escolhe qual oferta (voo ou carro) atende o segmento k dessa rota. Todo indivíduo
+    decodifica para um itinerário válido, então o espaço de busca é o produto das
+    escolhas por segmento e não 2^(n_voos + n_carros).
+
+    Com horarios = (GradeHorarios, conexão mínima, espera máxima), a espera entre trechos
+    entra no tempo e uma segunda restrição conta as conexões inviáveis.
+    """
+
+    def __init__(self, rotas_ofertas, custos, tempos, budget, horarios=None):
+        # rotas_ofertas[p][k]: array com os IDs globais das ofertas do segmento k da rota p
+        self.rotas_ofertas = rotas_ofertas
+        self.horarios = horarios
+        self.custos = np.asarray(custos, dtype=float)
+        self.tempos = np.asarray(tempos, dtype=float)
+        self.budget = budget
+
+        n_seg = max(len(segmentos) for segmentos in rotas_ofertas)
+
+        # Limite superior de cada gene de segmento: maior número de ofertas entre as rotas
+        # (rotas com menos ofertas usam o gene módulo o seu próprio número de ofertas)
+        xu = [len(rotas_ofertas) - 1]
+        for k in range(n_seg):
+            xu.append(max((len(segmentos[k]) for segmentos in rotas_ofertas if k < len(segmentos)), default=1) - 1)
+
+        super().__init__(n_var=1 + n_seg, n_obj=2, n_ieq_constr=1 if horarios is None else 2,
+                         xl=0, xu=np.array(xu), vtype=int)
+
+    def decode(self, x):
+        """Decodifica um indivíduo na lista ordenada de IDs de ofertas do itinerário"""
+        p = int(x[0])
+        return [int(ofertas[int(x[k + 1]) % len(ofertas)]) for k, ofertas in enumerate(self.rotas_ofertas[p])]
+
+    def _evaluate(self, x, out, *args, **kwargs):
+        """Avalia a população agrupando os indivíduos por rota"""
+        X = np.atleast_2d(x).astype(int)
+        custos = np.zeros(len(X))
+        tempos = np.zeros(len(X))
+        chegadas = np.full(len(X), -np.inf)
+        inviaveis = np.zeros(len(X))
+
+        for p, segmentos in enumerate(self.rotas_ofertas):
+            mask = X[:, 0] == p
+            if not mask.any():
+                continue
+            for k, ofertas in enumerate(segmentos):
+                ids = ofertas[X[mask, k + 1] % len(ofertas)]
+                custos[mask] += self.custos[ids]
+                tempos[mask] += self.tempos[ids]
+                if self.horarios is not None:
+                    grade, conexao, espera_max = self.horarios
+                    _, esperas, chegadas[mask], viavel = propagar(grade, chegadas[mask], ids, conexao, espera_max)
+                    tempos[mask] += esperas
+                    inviaveis[mask] += ~viavel
+
+        out["F"] = np.column_stack([custos, tempos])
+        if self.horarios is None:
+            out["G"] = np.column_stack([custos - self.budget])
+        else:
+            out["G"] = np.column_stack([custos - self.budget, inviaveis])
+
+
+class SegmentSampling(Sampling):
+    """Amostragem uniforme: rota aleatória e oferta aleatória em cada segmento"""
+
+    def _do(self, problem, n_samples, **kwargs):
+        xl, xu = problem.bounds()
+        return np.column_stack([np.random.randint(xl[k], xu[k] + 1, size=n_samples) for k in range(problem.n_var)])
+
+
+def sementes_kbest(rotas_ofertas, custos, tempos, alpha=0.5, n=100):
+    """Genes das combinações mais baratas, mais rápidas e melhores pelo alpha.
+
+    Cada rota contribui com as k primeiras combinações de cada critério, enumeradas pela
+    fila de prioridade sem montar o produto das ofertas. Em cada critério as combinações
+    de todas as rotas são ordenadas pelo valor, e a lista final intercala os critérios,
+    então um corte em n mantém as melhores de cada um.
+    """
+    custos = np.asarray(custos, dtype=float)
+    tempos = np.asarray(tempos, dtype=float)
+    n_var = 1 + max(len(segmentos) for segmentos in rotas_ofertas)
+    k = max(1, -(-n // len(rotas_ofertas)))
+
+    criterios = [[], [], []]
+    for p, segmentos in enumerate(rotas_ofertas):
+        c = [custos[ofertas] for ofertas in segmentos]
+        t = [tempos[ofertas] for ofertas in segmentos]
+        # Mesmo score por segmento do modo amostragem
+        score = [
+            alpha * (ci - ci.min()) / (np.ptp(ci) or 1) + (1 - alpha) * (ti - ti.min()) / (np.ptp(ti) or 1)
+            for ci, ti in zip(c, t)
+        ]
+        for lista, valores in zip(criterios, (c, t, score)):
+            lista.extend((soma, (p,) + indices) for soma, indices in k_melhores([v.tolist() for v in valores], k))
+
+    vistos = set()
+    genes = []
+    for posicao in range(max(len(lista) for lista in criterios)):
+        for lista in criterios:
+            if posicao == 0:
+                lista.sort(key=lambda item: item[0])
+            if posicao < len(lista) and lista[posicao][1] not in vistos:
+                gene = lista[posicao][1]
+                vistos.add(gene)
+                genes.append(gene + (0,) * (n_var - len(gene)))
+        if len(genes) >= n:
+            break
+    return np.array(genes[:n], dtype=int).reshape(-1, n_var)
+
+
+class SegmentWarmSampling(Sampling):
+    """População inicial a partir de sementes: as sementes, perturbações delas e o restante
+    uniforme para manter diversidade"""
+
+    def __init__(self, sementes, frac_sementes=0.5, frac_perturbadas=0.3):
+        super().__init__()
+        self.sementes = np.asarray(sementes, dtype=int)
+        self.frac_sementes = frac_sementes
+        self.frac_perturbadas = frac_perturbadas
+
+    def _do(self, problem, n_samples, **kwargs):
+        if len(self.sementes) == 0:
+            return SegmentSampling()._do(problem, n_samples)
+
+        xl, xu = problem.bounds()
+        base = self.sementes[:int(n_samples * self.frac_sementes)]
+        n_pert = min(int(n_samples * self.frac_perturbadas), n_samples - len(base))
+
+        # Perturbação: uma semente sorteada com uma oferta (gene de segmento) trocada
+        pert = self.sementes[np.random.randint(len(self.sementes), size=n_pert)].copy()
+        if problem.n_var > 1:
+            genes = np.random.randint(1, problem.n_var, size=n_pert)
+            pert[np.arange(n_pert), genes] = np.random.randint(xl[genes], xu[genes] + 1)
+
+        aleatorios = SegmentSampling()._do(problem, n_samples - len(base) - n_pert)
+        return np.vstack([base, pert, aleatorios]).astype(int)
+
+
+class SegmentCrossover(Crossover):
+    """Crossover uniforme gene a gene; a decodificação por módulo mantém os filhos válidos"""
+
+    def __init__(self, prob=0.9, **kwargs):
+        super().__init__(2, 2, prob=prob, **kwargs)
+
+    def _do(self, problem, X, **kwargs):
+        _, n_matings, n_var = X.shape
+        troca = np.random.random((n_matings, n_var)) < 0.5
+
+        Y = X.copy()
+        Y[0][troca] = X[1][troca]
+        Y[1][troca] = X[0][troca]
+        return Y
+
+
+class SegmentMutation(Mutation):
+    """Mutação por reinicialização: sorteia outra rota ou outra oferta para o segmento"""
+
+    def _do(self, problem, X, **kwargs):
+        X = X.copy()
+        xl, xu = problem.bounds()
+        prob_var = self.get_prob_var(problem, size=len(X))
+
+        muta = np.random.random(X.shape) < prob_var[:, None]
+        novos = np.column_stack([np.random.randint(xl[k], xu[k] + 1, size=len(X)) for k in range(problem.n_var)])
+        X[muta] = novos[muta]
+        return X
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+
+class Segmento:
+    """Ofertas de um par (origem, destino): IDs globais, custo, tempo e modo de cada uma"""
+
+    __slots__ = ('ids', 'custos', 'tempos', 'modos')
+
+    def __init__(self, ids, custos, tempos, modos):
+        self.ids = ids
+        self.custos = custos
+        self.tempos = tempos
+        self.modos = modos  # 'voo' ou 'carro' por oferta
+
+    def __len__(self):
+        return len(self.ids)
+
+    def do_modo(self, modo):
+        """IDs das ofertas de um modo, preservando a ordem do segmento"""
+        return self.ids[self.modos == modo]
+
+
+class SegmentIndex:
+    """Índice (origem, destino) -> ofertas, montado uma vez a cada carga dos dados.
+
+    Os IDs seguem a numeração global do engine (voos em [0, n_voos), carros depois), e
+    dentro de cada segmento as ofertas ficam nessa mesma ordem. Os arrays de custo, tempo
+    e modo são extraídos na construção, então as consultas não copiam DataFrames.
+    `horarios` é a GradeHorarios das mesmas ofertas (backend/horarios.py), que o engine
+    só monta quando a configuração pede conexões viáveis nos horários.
+    """
+
+    def __init__(self, origens, destinos, custos, tempos, n_voos, horarios=None):
+        self.horarios = horarios
+        custos = np.asarray(custos, dtype=float)
+        tempos = np.asarray(tempos, dtype=float)
+        modos = np.where(np.arange(len(custos)) < n_voos, 'voo', 'carro')
+
+        self._vazio = Segmento(np.empty(0, dtype=int), np.empty(0), np.empty(0), np.empty(0, dtype=modos.dtype))
+        self._segmentos = {}
+        if len(custos) == 0:
+            return
+
+        grupos = pd.DataFrame({'origem': origens, 'destino': destinos}).groupby(['origem', 'destino'], sort=False).indices
+        for par, ids in grupos.items():
+            ids = np.asarray(ids, dtype=int)
+            self._segmentos[par] = Segmento(ids, custos[ids], tempos[ids], modos[ids])
+
+    @classmethod
+    def from_frames(cls, df_voos, df_carros, custos, tempos, horarios=None):
+        """Monta o índice a partir dos DataFrames já processados pelo engine"""
+        origens = df_voos['origem'].tolist() + df_carros['local_retirada'].tolist()
+        destinos = df_voos['destino'].tolist() + df_carros['local_entrega'].tolist()
+        return cls(origens, destinos, custos, tempos, len(df_voos), horarios)
+
+    def __contains__(self, par):
+        return par in self._segmentos
+
+    def segmento(self, origem, destino):
+        """Ofertas do segmento; segmento vazio quando não há conexão"""
+        return self._segmentos.get((origem, destino), self._vazio)
+
+    def conexoes(self):
+        """Conjunto dos pares (origem, destino) com pelo menos uma oferta"""
+        return set(self._segmentos)
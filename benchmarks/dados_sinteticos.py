@@ -0,0 +1,92 @@
+import math
+import os
+import random
+import sqlite3
+
+from backend.migrations import garantir_esquema
+
+COMPANHIAS = ['Azul', 'GOL', 'LATAM', 'American', 'Delta', 'United']
+LOCADORAS = ['Localiza', 'Movida', 'Unidas', 'Hertz']
+
+
+def codigos_aeroportos(n):
+    """Códigos sintéticos no formato IATA: origem 'ORG' e destinos 'D00', 'D01', ..."""
+    return ['ORG'] + [f'D{i:02d}' for i in range(n - 1)]
+
+
+def _duracao_texto(minutos):
+    return f"{minutos // 60}h {minutos % 60}m"
+
+
+def gerar_banco(caminho, n_aeroportos=6, ofertas_por_segmento=20, cobertura_carros=0.5,
+                data_ida='2026-03-01', seed=0):
+    """Cria um banco SQLite com o esquema do projeto e ofertas sintéticas entre aeroportos.
+
+    Todo par ordenado de aeroportos recebe `ofertas_por_segmento` voos; uma fração
+    `cobertura_carros` dos pares recebe também aluguéis de carro (metade do número de
+    voos). As posições dos aeroportos são sorteadas num plano, a distância define a
+    duração base, e voos com mais escalas são mais lentos e mais baratos, para que
+    cada segmento tenha um compromisso real entre custo e tempo.
+
+    Returns:
+        lista dos códigos de aeroporto (origem primeiro)
+    """
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    garantir_esquema(caminho)
+
+    rng = random.Random(seed)
+    aeroportos = codigos_aeroportos(n_aeroportos)
+    posicoes = {a: (rng.uniform(0, 3000), rng.uniform(0, 3000)) for a in aeroportos}
+
+    voos = []
+    carros = []
+    for origem in aeroportos:
+        for destino in aeroportos:
+            if origem == destino:
+                continue
+            (x1, y1), (x2, y2) = posicoes[origem], posicoes[destino]
+            distancia = max(150.0, math.hypot(x2 - x1, y2 - y1))
+            voo_direto = 40 + distancia / 800 * 60
+
+            for _ in range(ofertas_por_segmento):
+                escalas = rng.choices([0, 1, 2], weights=[0.4, 0.4, 0.2])[0]
+                minutos = int(voo_direto * rng.uniform(0.95, 1.15) + escalas * rng.uniform(60, 240))
+                preco = round((200 + distancia * 0.6) * rng.uniform(0.7, 1.6) * (1 - 0.15 * escalas), 2)
+                voos.append((
+                    origem, destino, data_ida, None, rng.choice(COMPANHIAS),
+                    f"R$ {preco:,.2f}", preco,
+                    '08:00', None, _duracao_texto(minutos),
+                    'Direto' if escalas == 0 else f"{escalas} parada{'s' if escalas > 1 else ''}",
+                    minutos,
+                ))
+
+            if rng.random() < cobertura_carros:
+                horas = distancia / 85
+                for _ in range(max(1, ofertas_por_segmento // 2)):
+                    dias = rng.randint(1, 5)
+                    preco = round(dias * rng.uniform(120, 450) + distancia * 0.3, 2)
+                    carros.append((
+                        origem, destino, data_ida, data_ida, rng.choice(['Compact', 'SUV', 'Economy']),
+                        rng.choice(LOCADORAS), '5 pessoas', f"R$ {preco:,.2f}", preco, round(preco / dias, 2),
+                        dias, f"{int(horas):02d}:{int(horas % 1 * 60):02d}", int(distancia),
+                        int(horas * 60),
+                    ))
+
+    conn = sqlite3.connect(caminho)
+    try:
+        with conn:
+            conn.executemany('''
+                INSERT INTO voos (origem, destino, data_ida, data_volta, companhia, preco_bruto, preco_numerico,
+                                  ida_saida, ida_chegada, ida_duracao, ida_escalas, ida_duracao_min)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', voos)
+            conn.executemany('''
+                INSERT INTO aluguel_carros (local_retirada, local_entrega, data_inicio, data_fim, categoria,
+                                            locadora, capacidade, preco_total, preco_numerico, valor_diaria,
+                                            dias_viagem, tempo_viagem_horas, distancia_km, tempo_viagem_min)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', carros)
+    finally:
+        conn.close()
+    return aeroportos
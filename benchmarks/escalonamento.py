@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from itertools import product
+
+import numpy as np
+import pymoo
+
+from backend.engine import TripOptimizerEngine
+from benchmarks.dados_sinteticos import gerar_banco
+from benchmarks.qualidade import medir_qualidade
+
+# Aeroportos extras no banco, fora da pesquisa: medem o custo de filtrar dados não usados
+AEROPORTOS_EXTRAS = 2
+
+
+def _versao_codigo():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _config(aeroportos, n_destinos, modo, orcamento, seed):
+    return {
+        'origem': aeroportos[0],
+        'destinos': aeroportos[1:n_destinos + 1],
+        'budget': orcamento,
+        'alpha': 0.5,
+        'route_mode': modo,
+        'cache_dados': False,  # Cada execução mede também a leitura do banco
+        'log_execucoes': False,
+        'seed': seed,
+    }
+
+
+def _instrumentado(db_path, config):
+    """Mesmas etapas de solve(), sob tracemalloc, contando os candidatos de cada fase"""
+    engine = TripOptimizerEngine(db_path, dict(config))
+    tracemalloc.start()
+    try:
+        engine.load_and_filter_data()
+        candidatos = engine._gerar_origens([config['origem']])
+        fronteira = engine._fronteira(list(candidatos)) or []
+        selecao = engine._selecionar(candidatos) or []
+        for sol in selecao:
+            engine._materializar(sol)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'memoria_pico_mb': pico / 2**20,
+        'candidatos': len(candidatos),
+        'fronteira': len(fronteira),
+        'solucoes': len(selecao),
+    }
+
+
+def medir_caso(db_path, aeroportos, n_destinos, modo, orcamento, repeticoes, seed, nsga2, qualidade=True):
+    config = _config(aeroportos, n_destinos, modo, orcamento, seed)
+
+    # Tempo de relógio sem tracemalloc, que deixaria a execução bem mais lenta
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        _, metadados = TripOptimizerEngine(db_path, dict(config)).solve(retornar_metadados=True)
+        tempos.append(time.perf_counter() - inicio)
+
+    resultado = {
+        'destinos': n_destinos,
+        'modo': modo,
+        'tempo_s': statistics.median(tempos),
+        'tempos_s': tempos,
+        'diagnostico': metadados.como_dict(),  # Fases e contadores da última repetição
+        **_instrumentado(db_path, config),
+    }
+
+    if nsga2:
+        engine = TripOptimizerEngine(db_path, dict(config))
+        engine.load_and_filter_data()
+        inicio = time.perf_counter()
+        solucoes = engine._solve_with_nsga2()
+        resultado['nsga2'] = {'tempo_s': time.perf_counter() - inicio, 'solucoes': len(solucoes)}
+    
+    # Quanto da fronteira verdadeira cada modo perdeu (só em instâncias pequenas o bastante
+    # para a busca exaustiva); None quando a instância é grande demais
+    if qualidade:
+        metricas = medir_qualidade(db_path, config, modos=[modo] + (['nsga2'] if nsga2 else []), seed=seed) or {}
+        resultado['qualidade'] = metricas.get(modo)
+        if nsga2:
+            resultado['nsga2']['qualidade'] = metricas.get('nsga2')
+    return resultado
+
+
+def executar(destinos, ofertas, coberturas, modos, orcamento=50000, repeticoes=3, seed=0,
+             nsga2=True, max_destinos_nsga2=5, qualidade=True):
+    """Roda a matriz (destinos x ofertas por segmento x cobertura de carros x modo)"""
+    casos = []
+    with tempfile.TemporaryDirectory() as pasta:
+        for n_destinos, n_ofertas, cobertura in product(destinos, ofertas, coberturas):
+            db_path = os.path.join(pasta, f'sintetico_{n_destinos}_{n_ofertas}_{cobertura}.db')
+            aeroportos = gerar_banco(db_path, n_destinos + 1 + AEROPORTOS_EXTRAS, n_ofertas, cobertura, seed=seed)
+            for modo in modos:
+                caso = medir_caso(db_path, aeroportos, n_destinos, modo, orcamento, repeticoes, seed,
+                                  nsga2=nsga2 and n_destinos <= max_destinos_nsga2, qualidade=qualidade)
+                caso.update(ofertas_por_segmento=n_ofertas, cobertura_carros=cobertura)
+                casos.append(caso)
+                print(f"destinos={n_destinos} ofertas={n_ofertas} carros={cobertura:.2f} {modo:<10} "
+                      f"{caso['tempo_s']:8.3f}s {caso['memoria_pico_mb']:7.1f} MB "
+                      f"candidatos={caso['candidatos']} soluções={caso['solucoes']}"
+                      + (f" HV={caso['qualidade']['hipervolume_relativo']:.4f}" if caso.get('qualidade') else ""))
+    return {
+        'ambiente': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pymoo': pymoo.__version__,
+            'plataforma': platform.platform(),
+            'commit': _versao_codigo(),
+        },
+        'parametros': {'orcamento': orcamento, 'repeticoes': repeticoes, 'seed': seed},
+        'casos': casos,
+    }
+
+
+def _chave(caso):
+    return caso['destinos'], caso['ofertas_por_segmento'], caso['cobertura_carros'], caso['modo']
+
+
+def comparar(relatorio, base):
+    """Razão de tempo (atual / base) e hipervolume relativo por caso presente nos dois relatórios"""
+    anteriores = {_chave(caso): caso for caso in base['casos']}
+    for caso in relatorio['casos']:
+        anterior = anteriores.get(_chave(caso))
+        if anterior is None:
+            continue
+        razao = caso['tempo_s'] / anterior['tempo_s'] if anterior['tempo_s'] else float('inf')
+        hv = ""
+        if caso.get('qualidade') and anterior.get('qualidade'):
+            hv = (f" HV {anterior['qualidade']['hipervolume_relativo']:.4f} -> "
+                  f"{caso['qualidade']['hipervolume_relativo']:.4f}")
+        print(f"destinos={caso['destinos']} ofertas={caso['ofertas_por_segmento']} "
+              f"carros={caso['cobertura_carros']:.2f} {caso['modo']:<10} "
+              f"{anterior['tempo_s']:8.3f}s -> {caso['tempo_s']:8.3f}s ({razao:5.2f}x){hv}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escalonamento do TripOptimizerEngine")
+    parser.add_argument('--destinos', type=int, nargs='+', default=[2, 3, 4, 5])
+    parser.add_argument('--ofertas', type=int, nargs='+', default=[10, 30])
+    parser.add_argument('--cobertura', type=float, nargs='+', default=[0.0, 0.5])
+    parser.add_argument('--modos', nargs='+', default=['amostragem', 'exato'])
+    parser.add_argument('--orcamento', type=float, default=50000)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sem-nsga2', action='store_true', help="Não medir o fallback NSGA-II")
+    parser.add_argument('--sem-qualidade', action='store_true',
+                        help="Não comparar com a fronteira exaustiva nas instâncias pequenas")
+    parser.add_argument('--saida', default='benchmark.json', help="Arquivo JSON do relatório")
+    parser.add_argument('--comparar', help="Relatório JSON anterior para comparar os tempos")
+    args = parser.parse_args()
+
+    relatorio = executar(args.destinos, args.ofertas, args.cobertura, args.modos, args.orcamento,
+                         args.repeticoes, args.seed, nsga2=not args.sem_nsga2, qualidade=not args.sem_qualidade)
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"Relatório salvo em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            comparar(relatorio, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
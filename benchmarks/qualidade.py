@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import tempfile
+from itertools import permutations, product
+from math import prod
+
+import numpy as np
+
+from backend.engine import TripOptimizerEngine
+from backend.pareto import hipervolume, nao_dominados
+from benchmarks.dados_sinteticos import gerar_banco
+
+# Acima disto (combinações de ofertas somadas sobre todas as ordens) a busca exaustiva é pulada
+LIMITE_COMBINACOES = 5_000_000
+
+MODOS = ['amostragem', 'exato', 'subconjuntos', 'nsga2']
+
+
+def _rotas(engine, origem, destinos):
+    """Ofertas por segmento de cada ordem de destinos, com retorno à origem quando existe"""
+    for ordem in permutations(destinos):
+        rota = [origem] + list(ordem)
+        if len(engine._segmentos.segmento(rota[-1], origem)):
+            rota.append(origem)
+        segmentos = [engine._segmentos.segmento(a, b).ids for a, b in zip(rota, rota[1:])]
+        if all(len(ids) for ids in segmentos):
+            yield segmentos
+
+
+def combinacoes(engine, origem, destinos):
+    return sum(prod(len(ids) for ids in segmentos) for segmentos in _rotas(engine, origem, destinos))
+
+
+def fronteira_exaustiva(engine, origem, destinos, orcamento):
+    """Pontos (custo, tempo) da fronteira verdadeira: soma de todas as combinações de ofertas
+    de todas as ordens, sem poda, seguida da varredura de não dominados"""
+    custos, tempos = [], []
+    for segmentos in _rotas(engine, origem, destinos):
+        c, t = np.zeros(1), np.zeros(1)
+        for ids in segmentos:
+            c = np.add.outer(c, engine._custos[ids]).ravel()
+            t = np.add.outer(t, engine._tempos[ids]).ravel()
+        dentro = c <= orcamento
+        frente = nao_dominados(c[dentro], t[dentro])
+        custos.append(c[dentro][frente])
+        tempos.append(t[dentro][frente])
+    if not custos:
+        return np.empty(0), np.empty(0)
+    c, t = np.concatenate(custos), np.concatenate(tempos)
+    frente = nao_dominados(c, t)
+    return c[frente], t[frente]
+
+
+def metricas(custos, tempos, verdade_c, verdade_t):
+    """Hipervolume relativo, IGD e soluções da fronteira verdadeira que faltam.
+
+    Objetivos normalizados pelos extremos da fronteira verdadeira; referência do
+    hipervolume em 1.1 nos dois eixos. O IGD é a distância média de cada ponto da
+    fronteira verdadeira ao ponto mais próximo encontrado pelo solver.
+    """
+    custos = np.asarray(custos, dtype=float)
+    tempos = np.asarray(tempos, dtype=float)
+    minimo = np.array([verdade_c.min(), verdade_t.min()])
+    escala = np.array([np.ptp(verdade_c) or 1, np.ptp(verdade_t) or 1])
+
+    verdade = (np.column_stack([verdade_c, verdade_t]) - minimo) / escala
+    if len(custos) == 0:
+        return {'hipervolume_relativo': 0.0, 'igd': None, 'faltando': len(verdade), 'fronteira_verdadeira': len(verdade)}
+    obtido = (np.column_stack([custos, tempos]) - minimo) / escala
+
+    hv_verdade = hipervolume(verdade[:, 0], verdade[:, 1], (1.1, 1.1))
+    hv_obtido = hipervolume(obtido[:, 0], obtido[:, 1], (1.1, 1.1))
+    distancias = np.sqrt(((verdade[:, None, :] - obtido[None, :, :]) ** 2).sum(axis=2))
+
+    # Um ponto da fronteira verdadeira falta quando nenhuma solução tem os mesmos objetivos
+    encontrados = {(round(c, 6), round(t, 6)) for c, t in zip(custos.tolist(), tempos.tolist())}
+    faltando = sum((round(c, 6), round(t, 6)) not in encontrados for c, t in zip(verdade_c.tolist(), verdade_t.tolist()))
+    return {
+        'hipervolume_relativo': hv_obtido / hv_verdade if hv_verdade else 1.0,
+        'igd': float(distancias.min(axis=1).mean()),
+        'faltando': faltando,
+        'fronteira_verdadeira': len(verdade),
+    }
+
+
+def candidatos_modo(engine, modo, seed=0):
+    """Candidatos gerados por um modo, antes do corte de 50 soluções pelo alpha"""
+    origem = engine.config['origem']
+    if modo == 'nsga2':
+        engine.config = dict(engine.config, seed=seed)
+        return engine._solve_with_nsga2()
+    if modo == 'subconjuntos':
+        engine.config = dict(engine.config, max_destinos_permutacao=0)
+    else:
+        engine.config = dict(engine.config, route_mode=modo)
+    return engine._gerar_origens([origem])
+
+
+def medir_qualidade(db_path, config, modos=MODOS, seed=0):
+    """Métricas de cada modo contra a fronteira exaustiva; None se a instância for grande demais"""
+    engine = TripOptimizerEngine(db_path, dict(config))
+    engine.load_and_filter_data()
+    origem, destinos, orcamento = config['origem'], config['destinos'], config['budget']
+    if combinacoes(engine, origem, destinos) > LIMITE_COMBINACOES:
+        return None
+
+    verdade_c, verdade_t = fronteira_exaustiva(engine, origem, destinos, orcamento)
+    if len(verdade_c) == 0:
+        return None
+
+    resultado = {}
+    for modo in modos:
+        engine.config = dict(config)
+        candidatos = [sol for sol in candidatos_modo(engine, modo, seed) if sol.custo <= orcamento]
+        resultado[modo] = metricas([s.custo for s in candidatos], [s.tempo for s in candidatos], verdade_c, verdade_t)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Qualidade da fronteira de cada modo contra a busca exaustiva")
+    parser.add_argument('--destinos', type=int, nargs='+', default=[2, 3])
+    parser.add_argument('--ofertas', type=int, nargs='+', default=[5, 10])
+    parser.add_argument('--cobertura', type=float, nargs='+', default=[0.0, 0.5])
+    parser.add_argument('--orcamento', type=float, default=50000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--saida', default='qualidade.json', help="Arquivo JSON do relatório")
+    args = parser.parse_args()
+
+    casos = []
+    with tempfile.TemporaryDirectory() as pasta:
+        for n_destinos, n_ofertas, cobertura in product(args.destinos, args.ofertas, args.cobertura):
+            db_path = os.path.join(pasta, 'sintetico.db')
+            aeroportos = gerar_banco(db_path, n_destinos + 1, n_ofertas, cobertura, seed=args.seed)
+            config = {'origem': aeroportos[0], 'destinos': aeroportos[1:n_destinos + 1],
+                      'budget': args.orcamento, 'alpha': 0.5, 'cache_dados': False}
+            qualidade = medir_qualidade(db_path, config, seed=args.seed)
+            casos.append({'destinos': n_destinos, 'ofertas_por_segmento': n_ofertas,
+                          'cobertura_carros': cobertura, 'qualidade': qualidade})
+            for modo, m in (qualidade or {}).items():
+                print(f"destinos={n_destinos} ofertas={n_ofertas} carros={cobertura:.2f} {modo:<12} "
+                      f"HV={m['hipervolume_relativo']:.4f} IGD={m['igd'] if m['igd'] is not None else float('nan'):.4f} "
+                      f"faltando={m['faltando']}/{m['fronteira_verdadeira']}")
+
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump({'parametros': vars(args), 'casos': casos}, f, indent=2, ensure_ascii=False)
+    print(f"Relatório salvo em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,9 @@ import re
 import os
 from playwright.sync_api import sync_playwright
 
+from backend.duracao import minutos_hhmm
+from backend.migrations import garantir_esquema
+
 # --- CONFIGURAÇÕES ---
 # Usar diretório de dados se existir (Docker ou local), senão usar diretório atual
 DATA_DIR = "/app/data" if os.path.exists("/app/data") else "data" if os.path.exists("data") else "."
@@ -54,25 +57,8 @@ def gerar_alugueis(destinos, data_inicio, data_fim):
     return alugueis
 
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS aluguel_carros (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            local_retirada TEXT, local_entrega TEXT,
-            data_inicio TEXT, data_fim TEXT,
-            categoria TEXT, locadora TEXT, capacidade TEXT,
-            preco_total TEXT, preco_numerico REAL,
-            valor_diaria REAL,
-            dias_viagem INTEGER,
-            tempo_viagem_horas TEXT,
-            distancia_km INTEGER,
-            mesmo_local INTEGER,
-            coletado_em DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    # Tabelas, colunas e índices ficam nas migrações compartilhadas com o engine
+    garantir_esquema(DB_NAME)
 
 def salvar_carro(dados):
     conn = sqlite3.connect(DB_NAME)
@@ -92,12 +78,13 @@ def salvar_carro(dados):
     cursor.execute('''
         INSERT INTO aluguel_carros (local_retirada, local_entrega, data_inicio, data_fim, 
                                    categoria, locadora, capacidade, preco_total, preco_numerico,
-                                   valor_diaria, dias_viagem, tempo_viagem_horas, distancia_km, mesmo_local)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                   valor_diaria, dias_viagem, tempo_viagem_horas, distancia_km, mesmo_local,
+                                   tempo_viagem_min)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     ''', (dados['retirada'], dados['entrega'], dados['data_ini'], dados['data_fim'], 
           dados['categoria'], dados['locadora'], dados['capacidade'], dados['preco'], preco_num,
           valor_diaria, dados.get('dias_viagem'), dados.get('tempo_viagem_horas'), 
-          dados.get('distancia_km'), mesmo_local))
+          dados.get('distancia_km'), mesmo_local, minutos_hhmm(dados.get('tempo_viagem_horas'))))
     conn.commit()
     conn.close()
 
@@ -5,6 +5,9 @@ import re
 import os
 from playwright.sync_api import sync_playwright
 
+from backend.duracao import minutos
+from backend.migrations import garantir_esquema
+
 # --- CONFIGURAÇÕES ---
 # Usar diretório de dados se existir (Docker ou local), senão usar diretório atual
 DATA_DIR = "/app/data" if os.path.exists("/app/data") else "data" if os.path.exists("data") else "."
@@ -43,20 +46,8 @@ def gerar_rotas(origem, destinos, data_ida, data_volta):
     return rotas
 
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS voos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            origem TEXT, destino TEXT, data_ida TEXT, data_volta TEXT,
-            companhia TEXT, preco_bruto TEXT, preco_numerico REAL,
-            ida_saida TEXT, ida_chegada TEXT, ida_duracao TEXT, ida_escalas TEXT,
-            volta_saida TEXT, volta_chegada TEXT, volta_duracao TEXT, volta_escalas TEXT,
-            coletado_em DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    # Tabelas, colunas e índices ficam nas migrações compartilhadas com o engine
+    garantir_esquema(DB_NAME)
 
 def salvar_voo(dados):
     conn = sqlite3.connect(DB_NAME)
@@ -99,12 +90,15 @@ def salvar_voo(dados):
     cursor.execute('''
         INSERT INTO voos (origem, destino, data_ida, data_volta, companhia, preco_bruto, preco_numerico, 
                           ida_saida, ida_chegada, ida_duracao, ida_escalas,
-                          volta_saida, volta_chegada, volta_duracao, volta_escalas)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                          volta_saida, volta_chegada, volta_duracao, volta_escalas,
+                          ida_duracao_min, volta_duracao_min)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     ''', (dados['origem'], dados['destino'], dados['ida'], data_volta, 
           dados['companhia'], dados['preco'], preco_num,
           dados.get('ida_saida'), dados.get('ida_chegada'), dados.get('ida_duracao'), dados.get('ida_escalas'),
-          dados.get('volta_saida'), dados.get('volta_chegada'), dados.get('volta_duracao'), dados.get('volta_escalas')))
+          dados.get('volta_saida'), dados.get('volta_chegada'), dados.get('volta_duracao'), dados.get('volta_escalas'),
+          minutos(dados.get('ida_duracao')),
+          minutos(dados.get('volta_duracao')) if dados.get('volta_duracao') else None))
     conn.commit()
     conn.close()
     return True
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from backend.engine import TripOptimizerEngine
+from benchmarks.dados_sinteticos import gerar_banco
+
+ALPHAS_BALANCEADOS = [0.35, 0.4, 0.5, 0.6, 0.65]
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_sweep_igual_ao_primeiro_de_solve(tmp_path, seed):
+    """Em alphas balanceados, cada célula do sweep é a primeira solução de solve() no modo exato.
+
+    Fronteiras pequenas (menos de 20 pontos) recebem vizinhos em _fronteira(), que mudam os
+    intervalos da normalização do score; o sweep precisa usar os mesmos.
+    """
+    db_path = str(tmp_path / 'sintetico.db')
+    aeroportos = gerar_banco(db_path, n_aeroportos=3, ofertas_por_segmento=4, cobertura_carros=0.5, seed=seed)
+    config = {
+        'origem': aeroportos[0], 'destinos': aeroportos[1:], 'budget': 1e6, 'alpha': 0.5,
+        'route_mode': 'exato', 'cache_dados': False, 'log_execucoes': False,
+    }
+
+    # Orçamentos que cortam a fronteira completa em prefixos de tamanhos diferentes
+    engine = TripOptimizerEngine(db_path, dict(config))
+    engine.sweep([1e6], [0.5])
+    custos = [sol.custo for sol in engine.fronteira_sweep]
+    orcamentos = sorted(set(np.quantile(custos, [0.25, 0.5, 0.75, 1.0]).tolist()))
+
+    grade = TripOptimizerEngine(db_path, dict(config)).sweep(orcamentos, ALPHAS_BALANCEADOS)
+    for linha in grade.itertuples():
+        solucoes = TripOptimizerEngine(db_path, dict(config, budget=linha.orcamento, alpha=linha.alpha)).solve()
+        assert solucoes, (linha.orcamento, linha.alpha)
+        esperado = (solucoes[0]['custo'], solucoes[0]['tempo'])
+        assert (linha.custo, linha.tempo) == pytest.approx(esperado), (linha.orcamento, linha.alpha)